@@ -0,0 +1,42 @@
+"""Adaptadores entre os serviços e a camada HTTP."""
+
+from fastapi import HTTPException, Request, status
+from fastapi.responses import JSONResponse
+from app.core.logging import logger
+from app.services.minio_service import MinIOError, MinIONotFoundError
+
+
+def to_http(exc: MinIOError) -> HTTPException:
+    """Converte um erro do serviço de armazenamento em HTTPException."""
+    if isinstance(exc, MinIONotFoundError):
+        return HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(exc)
+        )
+    return HTTPException(
+        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+        detail=str(exc)
+    )
+
+
+async def minio_exception_handler(request: Request, exc: MinIOError) -> JSONResponse:
+    """Handler para erros do MinIO."""
+    http_exc = to_http(exc)
+    logger.warning(
+        f"MinIOError: {http_exc.status_code} - {http_exc.detail} "
+        f"- URL: {request.url} "
+        f"- Método: {request.method}"
+    )
+    
+    return JSONResponse(
+        status_code=http_exc.status_code,
+        content={"detail": http_exc.detail}
+    )
+
+
+def get_user_cache(request: Request) -> dict:
+    """Cache de usuários da requisição atual (ver UserService.get_user_by_id)."""
+    cache = getattr(request.state, "user_cache", None)
+    if cache is None:
+        cache = request.state.user_cache = {}
+    return cache
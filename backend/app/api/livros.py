@@ -1,11 +1,12 @@
 from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, BackgroundTasks
-from fastapi.responses import StreamingResponse
+from fastapi.responses import StreamingResponse, FileResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.auth import get_current_user
 from app.services.livro_service import LivroService
 from app.services.pdf_processor import pdf_processor
+from app.services.minio_service import MinIOError
 from app.schemas.livro import (
     LivroCreate, LivroUpdate, LivroResponse, LivroListResponse,
     LivroStatsResponse, LivroWithAtos
@@ -13,7 +14,8 @@ from app.schemas.livro import (
 from app.schemas import MessageResponse
 from app.models.user import User
 from app.core.logging import logger
-import io
+import orjson
+import os
 
 router = APIRouter(prefix="/livros", tags=["livros"])
 livro_service = LivroService()
@@ -201,7 +203,7 @@ async def upload_pdf(
         logger.info(f"PDF enviado para livro {livro_id} por {current_user.email}")
         return result
         
-    except HTTPException:
+    except (HTTPException, MinIOError):
         raise
     except Exception as e:
         logger.error(f"Erro no upload de PDF para livro {livro_id}: {str(e)}")
@@ -211,6 +213,58 @@ async def upload_pdf(
         )
 
 
+@router.post("/{livro_id}/upload-pdf/presigned")
+async def initiate_pdf_upload(
+    livro_id: int,
+    filename: str = Query(..., description="Nome do arquivo PDF"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Obter URL pré-assinada para enviar o PDF diretamente ao armazenamento."""
+    try:
+        result = await pdf_processor.initiate_pdf_upload(
+            livro_id=livro_id,
+            filename=filename,
+            db=db
+        )
+        
+        logger.info(f"URL de upload direto gerada para livro {livro_id} por {current_user.email}")
+        return result
+        
+    except (HTTPException, MinIOError):
+        raise
+    except Exception as e:
+        logger.error(f"Erro ao gerar URL de upload para livro {livro_id}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Erro no upload: {str(e)}"
+        )
+
+
+@router.post("/{livro_id}/upload-pdf/complete")
+async def complete_pdf_upload(
+    livro_id: int,
+    background_tasks: BackgroundTasks,
+    object_name: str = Query(..., description="Objeto retornado pela URL pré-assinada"),
+    filename: str = Query(..., description="Nome original do arquivo PDF"),
+    process_immediately: bool = Query(True, description="Processar PDF imediatamente"),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Confirmar upload direto do PDF e iniciar processamento."""
+    result = await pdf_processor.complete_pdf_upload(
+        livro_id=livro_id,
+        object_name=object_name,
+        filename=filename,
+        db=db,
+        background_tasks=background_tasks,
+        process_immediately=process_immediately
+    )
+    
+    logger.info(f"Upload direto de PDF confirmado para livro {livro_id} por {current_user.email}")
+    return result
+
+
 @router.post("/{livro_id}/reprocess-pdf")
 async def reprocess_pdf(
     livro_id: int,
@@ -266,9 +320,40 @@ async def get_processing_status(
         )
 
 
+@router.get("/{livro_id}/processing-status/stream")
+async def stream_processing_status(
+    livro_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Acompanhar o processamento de um livro via Server-Sent Events.
+    
+    Envia o status atual e cada mudança até "concluido" ou "erro";
+    GET /processing-status continua disponível para polling.
+    """
+    eventos = await pdf_processor.open_status_stream(livro_id=livro_id, db=db)
+    
+    # Liberar a conexão do banco: o stream pode durar minutos
+    await db.close()
+    
+    async def event_stream():
+        async for evento in eventos:
+            if evento is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {orjson.dumps(evento).decode()}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/{livro_id}/download-pdf")
 async def get_pdf_download_url(
     livro_id: int,
+    refresh: bool = Query(False, description="Gerar uma nova URL ignorando o cache"),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -277,12 +362,13 @@ async def get_pdf_download_url(
         download_info = await pdf_processor.download_pdf(
             livro_id=livro_id,
             db=db,
-            generate_presigned=True
+            generate_presigned=True,
+            refresh=refresh
         )
         
         return download_info
         
-    except HTTPException:
+    except (HTTPException, MinIOError):
         raise
     except Exception as e:
         logger.error(f"Erro ao gerar URL de download para livro {livro_id}: {str(e)}")
@@ -306,23 +392,20 @@ async def download_pdf_direct(
             generate_presigned=False
         )
         
-        file_content = download_info["file_content"]
         file_info = download_info["file_info"]
         
-        # Criar stream de resposta
-        file_stream = io.BytesIO(file_content)
-        
         headers = {
             "Content-Disposition": f"attachment; filename={file_info['original_filename']}"
         }
         
+        # Repassar os blocos do MinIO direto ao cliente
         return StreamingResponse(
-            io.BytesIO(file_content),
+            download_info["file_stream"],
             media_type=file_info["content_type"],
             headers=headers
         )
         
-    except HTTPException:
+    except (HTTPException, MinIOError):
         raise
     except Exception as e:
         logger.error(f"Erro no download direto do PDF para livro {livro_id}: {str(e)}")
@@ -332,6 +415,34 @@ async def download_pdf_direct(
         )
 
 
+@router.get("/{livro_id}/pdf")
+async def get_pdf_file(
+    livro_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Servir o PDF armazenado localmente para o livro."""
+    livro = await livro_service.get_by_id(db, livro_id)
+    if not livro:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Livro não encontrado"
+        )
+    
+    if not livro.caminho_pdf or not os.path.isfile(livro.caminho_pdf):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="PDF não encontrado para este livro"
+        )
+    
+    # FileResponse entrega o arquivo direto do disco, sem carregá-lo em memória
+    return FileResponse(
+        livro.caminho_pdf,
+        media_type="application/pdf",
+        filename=livro.nome_arquivo_original or f"livro_{livro_id}.pdf"
+    )
+
+
 # Endpoints para gerenciamento de status
 
 @router.put("/{livro_id}/status")
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.session import get_db
 from app.core.auth import get_current_user, require_admin
 from app.services.user_service import UserService
+from app.api.deps import get_user_cache
 from app.schemas.user import (
     UserCreate, UserUpdate, UserResponse, UserListResponse,
     UserStatsResponse, PasswordUpdateRequest
@@ -11,6 +12,7 @@ from app.schemas.user import (
 from app.schemas import MessageResponse
 from app.models.user import User
 from app.core.logging import logger
+import uuid
 
 router = APIRouter(prefix="/users", tags=["users"])
 user_service = UserService()
@@ -23,9 +25,11 @@ async def create_user(
     current_user: User = Depends(require_admin)
 ):
     """Criar um novo usuário (apenas administradores)."""
+    # Lido antes do serviço: o rollback de uma nova tentativa expira current_user
+    actor_email = current_user.email
     try:
         user = await user_service.create_user(db, user_data)
-        logger.info(f"Usuário criado: {user.email} por {current_user.email}")
+        logger.info(f"Usuário criado: {user.email} por {actor_email}")
         return user
     except ValueError as e:
         raise HTTPException(
@@ -80,7 +84,7 @@ async def get_user_stats(
 
 @router.get("/{user_id}", response_model=UserResponse)
 async def get_user(
-    user_id: int,
+    user_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -106,14 +110,16 @@ async def get_user(
 async def update_current_user(
     user_data: UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Atualizar informações do usuário atual."""
+    actor_email = current_user.email
     try:
         updated_user = await user_service.update_user(
-            db, current_user.id, user_data, current_user
+            db, current_user.id, user_data, current_user, cache=user_cache
         )
-        logger.info(f"Usuário atualizado: {current_user.email}")
+        logger.info(f"Usuário atualizado: {actor_email}")
         return updated_user
     except ValueError as e:
         raise HTTPException(
@@ -129,17 +135,19 @@ async def update_current_user(
 
 @router.put("/{user_id}", response_model=UserResponse)
 async def update_user(
-    user_id: int,
+    user_id: uuid.UUID,
     user_data: UserUpdate,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: User = Depends(require_admin),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Atualizar usuário por ID (apenas administradores)."""
+    actor_email = current_user.email
     try:
         updated_user = await user_service.update_user(
-            db, user_id, user_data, current_user
+            db, user_id, user_data, current_user, cache=user_cache
         )
-        logger.info(f"Usuário {user_id} atualizado por {current_user.email}")
+        logger.info(f"Usuário {user_id} atualizado por {actor_email}")
         return updated_user
     except ValueError as e:
         raise HTTPException(
@@ -157,14 +165,16 @@ async def update_user(
 async def update_current_user_password(
     password_data: PasswordUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Atualizar senha do usuário atual."""
+    actor_email = current_user.email
     try:
         await user_service.update_password(
-            db, current_user.id, password_data, current_user
+            db, current_user.id, password_data, current_user, cache=user_cache
         )
-        logger.info(f"Senha atualizada para usuário: {current_user.email}")
+        logger.info(f"Senha atualizada para usuário: {actor_email}")
         return MessageResponse(message="Senha atualizada com sucesso")
     except ValueError as e:
         raise HTTPException(
@@ -180,17 +190,19 @@ async def update_current_user_password(
 
 @router.put("/{user_id}/password", response_model=MessageResponse)
 async def update_user_password(
-    user_id: int,
+    user_id: uuid.UUID,
     password_data: PasswordUpdateRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: User = Depends(require_admin),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Atualizar senha de usuário por ID (apenas administradores)."""
+    actor_email = current_user.email
     try:
         await user_service.update_password(
-            db, user_id, password_data, current_user
+            db, user_id, password_data, current_user, cache=user_cache
         )
-        logger.info(f"Senha do usuário {user_id} atualizada por {current_user.email}")
+        logger.info(f"Senha do usuário {user_id} atualizada por {actor_email}")
         return MessageResponse(message="Senha atualizada com sucesso")
     except ValueError as e:
         raise HTTPException(
@@ -206,14 +218,16 @@ async def update_user_password(
 
 @router.post("/{user_id}/deactivate", response_model=MessageResponse)
 async def deactivate_user(
-    user_id: int,
+    user_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: User = Depends(require_admin),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Desativar usuário (apenas administradores)."""
+    actor_email = current_user.email
     try:
-        await user_service.deactivate_user(db, user_id, current_user)
-        logger.info(f"Usuário {user_id} desativado por {current_user.email}")
+        await user_service.deactivate_user(db, user_id, current_user, cache=user_cache)
+        logger.info(f"Usuário {user_id} desativado por {actor_email}")
         return MessageResponse(message="Usuário desativado com sucesso")
     except ValueError as e:
         raise HTTPException(
@@ -229,14 +243,16 @@ async def deactivate_user(
 
 @router.post("/{user_id}/activate", response_model=MessageResponse)
 async def activate_user(
-    user_id: int,
+    user_id: uuid.UUID,
     db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(require_admin)
+    current_user: User = Depends(require_admin),
+    user_cache: dict = Depends(get_user_cache)
 ):
     """Ativar usuário (apenas administradores)."""
+    actor_email = current_user.email
     try:
-        await user_service.activate_user(db, user_id, current_user)
-        logger.info(f"Usuário {user_id} ativado por {current_user.email}")
+        await user_service.activate_user(db, user_id, current_user, cache=user_cache)
+        logger.info(f"Usuário {user_id} ativado por {actor_email}")
         return MessageResponse(message="Usuário ativado com sucesso")
     except ValueError as e:
         raise HTTPException(
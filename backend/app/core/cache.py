@@ -0,0 +1,20 @@
+"""Cliente Redis compartilhado (opcional, habilitado por CACHE_ENABLED)."""
+
+from functools import lru_cache
+from typing import Optional
+from redis import asyncio as aioredis
+from app.core.config import settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> Optional[aioredis.Redis]:
+    """Retorna o cliente Redis, ou None quando o cache está desabilitado."""
+    if not settings.CACHE_ENABLED:
+        return None
+    
+    return aioredis.from_url(
+        settings.REDIS_URL,
+        password=settings.REDIS_PASSWORD or None,
+        max_connections=settings.REDIS_MAX_CONNECTIONS,
+        decode_responses=True
+    )
@@ -23,6 +23,10 @@ class Settings(BaseSettings):
         default="sqlite+aiosqlite:///./test.db",
         env="DATABASE_URL_TEST"
     )
+    DATABASE_POOL_SIZE: int = Field(default=20, env="DATABASE_POOL_SIZE")
+    DATABASE_MAX_OVERFLOW: int = Field(default=10, env="DATABASE_MAX_OVERFLOW")
+    DATABASE_POOL_TIMEOUT: int = Field(default=30, env="DATABASE_POOL_TIMEOUT")
+    DATABASE_POOL_RECYCLE: int = Field(default=1800, env="DATABASE_POOL_RECYCLE")
     
     # Security
     SECRET_KEY: str = Field(
@@ -47,6 +51,18 @@ class Settings(BaseSettings):
     MAX_FILE_SIZE: int = Field(default=50000000, env="MAX_FILE_SIZE")  # 50MB
     UPLOAD_DIR: str = Field(default="./uploads", env="UPLOAD_DIR")
     
+    # MinIO
+    MINIO_POOL_SIZE: int = Field(default=64, env="MINIO_POOL_SIZE")
+    
+    # LangFlow
+    LANGFLOW_CONCURRENCY: int = Field(default=4, env="LANGFLOW_CONCURRENCY")
+    
+    # Cache (Redis)
+    CACHE_ENABLED: bool = Field(default=False, env="CACHE_ENABLED")
+    REDIS_URL: str = Field(default="redis://localhost:6379/0", env="REDIS_URL")
+    REDIS_PASSWORD: Optional[str] = Field(default=None, env="REDIS_PASSWORD")
+    REDIS_MAX_CONNECTIONS: int = Field(default=10, env="REDIS_MAX_CONNECTIONS")
+    
     # Logging
     LOG_LEVEL: str = Field(default="INFO", env="LOG_LEVEL")
     LOG_FILE: str = Field(default="./logs/app.log", env="LOG_FILE")
@@ -61,6 +77,11 @@ class Settings(BaseSettings):
     def validate_database_url(cls, v):
         if not v:
             raise ValueError("DATABASE_URL é obrigatório")
+        # Garantir o driver asyncpg para PostgreSQL (protocolo binário e
+        # cache de prepared statements)
+        for prefix in ("postgres://", "postgresql://", "postgresql+psycopg2://", "postgresql+psycopg://"):
+            if v.startswith(prefix):
+                return "postgresql+asyncpg://" + v[len(prefix):]
         return v
     
     def get_current_timestamp(self) -> str:
@@ -95,5 +116,4 @@ class Settings(BaseSettings):
 settings = Settings()
 
 # Criar diretórios necessários
-os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
-os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
\ No newline at end of file
+os.makedirs(os.path.dirname(settings.LOG_FILE), exist_ok=True)
\ No newline at end of file
@@ -1,5 +1,5 @@
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import Column, Integer, DateTime, func
+from sqlalchemy import Column, Integer, DateTime, Index, DDL, event, func
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from typing import Any
 
@@ -7,6 +7,10 @@ from typing import Any
 class Base(AsyncAttrs, declarative_base()):
     """Classe base para todos os modelos SQLAlchemy."""
     
+    # Buscar defaults do servidor (id, created_at, updated_at) via RETURNING
+    # no próprio INSERT/UPDATE, dispensando session.refresh() após o commit
+    __mapper_args__ = {"eager_defaults": True}
+    
     # Campos comuns para auditoria
     id = Column(Integer, primary_key=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -37,4 +41,34 @@ from app.models.livro import Livro  # noqa
 from app.models.ato import Ato, Averbacao  # noqa
 from app.models.cliente import Cliente, Contato, Endereco, DocumentoCliente, Observacao, Evento, CampoAdicionalCliente  # noqa
 from app.models.config import AppConfig  # noqa
-from app.models.ai_usage import AiUsageLog  # noqa
\ No newline at end of file
+from app.models.ai_usage import AiUsageLog  # noqa
+
+
+# Índice funcional para a busca de usuário por email sem diferenciar
+# maiúsculas (UserService.get_user_by_email)
+Index("ix_users_email_lower", func.lower(User.email))
+
+# Hash do PDF enviado, usado para recusar uploads duplicados. A coluna só
+# existe depois da migração do modelo Livro; até lá o hash não é gravado
+# nem consultado.
+LIVRO_HAS_PDF_SHA256 = hasattr(Livro, "pdf_sha256")
+if LIVRO_HAS_PDF_SHA256:
+    Index("ix_livros_pdf_sha256", Livro.pdf_sha256)
+
+# Colunas da busca de usuário (UserService.list_users), cada uma indexada
+# por trigramas no PostgreSQL para que ILIKE '%termo%' use o índice; o OR
+# entre as colunas é resolvido com BitmapOr dos três índices
+USER_SEARCH_COLUMNS = (User.name, User.email, User.department)
+
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+for _column in USER_SEARCH_COLUMNS:
+    Index(
+        f"ix_users_{_column.name}_trgm",
+        _column,
+        postgresql_using="gin",
+        postgresql_ops={_column.name: "gin_trgm_ops"},
+    ).ddl_if(dialect="postgresql")
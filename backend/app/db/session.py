@@ -1,8 +1,18 @@
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 from typing import AsyncGenerator
+from contextlib import asynccontextmanager
 from app.core.config import settings
 from loguru import logger
+import orjson
+
+
+def _json_serializer(obj) -> str:
+    """Serializa colunas JSON com orjson (mais rápido que json.dumps).
+    
+    As chaves são ordenadas para que o mesmo conteúdo gere sempre o mesmo texto.
+    """
+    return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode()
 
 
 # Configurar engine do banco de dados
@@ -15,6 +25,8 @@ if "sqlite" in settings.get_database_url():
         connect_args={
             "check_same_thread": False,
         },
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
     )
 else:
     # Configuração para PostgreSQL
@@ -22,8 +34,13 @@ else:
         settings.get_database_url(),
         echo=settings.DEBUG,
         pool_pre_ping=True,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        use_insertmanyvalues=True,
+        json_serializer=_json_serializer,
+        json_deserializer=orjson.loads,
     )
 
 # Criar session factory
@@ -49,6 +66,18 @@ async def get_session() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
+@asynccontextmanager
+async def get_db_session() -> AsyncGenerator[AsyncSession, None]:
+    """Abre uma sessão nova por uso, para tarefas fora do ciclo de requisição."""
+    async with AsyncSessionLocal() as session:
+        try:
+            yield session
+        except Exception as e:
+            logger.error(f"Erro na sessão do banco de dados: {e}")
+            await session.rollback()
+            raise
+
+
 async def init_db() -> None:
     """Inicializa o banco de dados criando as tabelas."""
     from app.db.base import Base
@@ -1,17 +1,20 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import logging
+import os
 from loguru import logger
 
 from app.core.config import settings
 from app.core.logging import setup_logging
 from app.db.session import engine, create_tables
 from app.api import api_router
-from app.services.minio_service import MinIOService
+from app.api.deps import minio_exception_handler
+from app.services.minio_service import get_minio_service, MinIOError
 from app.services.config_service import ConfigService
 
 
@@ -24,15 +27,18 @@ async def lifespan(app: FastAPI):
         # Configurar logging
         setup_logging()
         
+        # Criar diretório de uploads uma única vez
+        os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
+        
         # Criar tabelas do banco de dados
         logger.info("Criando tabelas do banco de dados...")
         await create_tables()
         logger.info("Tabelas criadas com sucesso")
         
-        # Inicializar MinIO
+        # Inicializar MinIO (cliente criado aqui para não pesar na primeira requisição)
         logger.info("Inicializando MinIO...")
-        minio_service = MinIOService()
-        await minio_service.ensure_buckets_exist()
+        minio_service = await asyncio.to_thread(get_minio_service)
+        await minio_service.ensure_bucket_exists(minio_service.default_bucket)
         logger.info("MinIO inicializado com sucesso")
         
         # Inicializar cache de configurações
@@ -63,6 +69,7 @@ app = FastAPI(
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
     openapi_url="/openapi.json" if settings.DEBUG else None,
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
@@ -163,6 +170,10 @@ async def http_exception_handler(request: Request, exc: HTTPException):
     )
 
 
+# Handler para erros do serviço de armazenamento
+app.add_exception_handler(MinIOError, minio_exception_handler)
+
+
 # Incluir roteadores da API
 app.include_router(api_router)
 
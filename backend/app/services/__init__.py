@@ -11,7 +11,7 @@ from .ato_service import AtoService, AverbacaoService
 from .cliente_service import ClienteService, ContatoService, EnderecoService
 from .config_service import ConfigService
 from .ai_usage_service import AiUsageService
-from .minio_service import MinIOService, minio_service
+from .minio_service import MinIOService, MinIOError, get_minio_service
 from .langflow_service import LangFlowService, langflow_service
 from .pdf_processor import PDFProcessorService, pdf_processor
 
@@ -29,7 +29,8 @@ __all__ = [
     
     # Serviços de infraestrutura
     "MinIOService",
-    "minio_service",
+    "MinIOError",
+    "get_minio_service",
     "LangFlowService",
     "langflow_service",
     
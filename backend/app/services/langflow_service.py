@@ -25,8 +25,37 @@ class LangFlowService:
             "classify_document": settings.LANGFLOW_FLOW_CLASSIFY_DOC
         }
         
+        # URL e cabeçalhos montados uma vez por fluxo
+        self._flow_requests: Dict[str, tuple] = {}
+        
+        # Cliente HTTP reaproveitado entre chamadas (mantém conexões abertas)
+        self._client: Optional[httpx.AsyncClient] = None
+        
         logger.info(f"Serviço LangFlow inicializado - Base URL: {self.base_url}")
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Retorna o cliente HTTP compartilhado, criando-o no primeiro uso."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout)
+        return self._client
+    
+    def _get_flow_request(self, flow_id: str) -> tuple:
+        """Retorna (url, headers) do fluxo, montados uma única vez."""
+        flow_request = self._flow_requests.get(flow_id)
+        if flow_request is None:
+            headers = {
+                "Content-Type": "application/json",
+                "Accept": "application/json"
+            }
+            
+            # Adicionar autenticação se configurada
+            if hasattr(settings, 'LANGFLOW_API_KEY') and settings.LANGFLOW_API_KEY:
+                headers["Authorization"] = f"Bearer {settings.LANGFLOW_API_KEY}"
+            
+            flow_request = (f"{self.base_url}/api/v1/run/{flow_id}", headers)
+            self._flow_requests[flow_id] = flow_request
+        return flow_request
+    
     async def _make_request(
         self,
         flow_id: str,
@@ -35,7 +64,7 @@ class LangFlowService:
     ) -> Dict[str, Any]:
         """Faz uma requisição para o LangFlow."""
         try:
-            url = f"{self.base_url}/api/v1/run/{flow_id}"
+            url, headers = self._get_flow_request(flow_id)
             
             payload = {
                 "input_value": inputs.get("input_value", ""),
@@ -48,35 +77,25 @@ class LangFlowService:
             if "inputs" in inputs:
                 payload.update(inputs["inputs"])
             
-            headers = {
-                "Content-Type": "application/json",
-                "Accept": "application/json"
-            }
-            
-            # Adicionar autenticação se configurada
-            if hasattr(settings, 'LANGFLOW_API_KEY') and settings.LANGFLOW_API_KEY:
-                headers["Authorization"] = f"Bearer {settings.LANGFLOW_API_KEY}"
-            
             logger.debug(f"Enviando requisição para LangFlow - Flow: {flow_id}")
             
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.post(
-                    url,
-                    json=payload,
-                    headers=headers
+            response = await self._get_client().post(
+                url,
+                json=payload,
+                headers=headers
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                logger.info(f"Resposta recebida do LangFlow - Flow: {flow_id}")
+                return result
+            else:
+                error_msg = f"Erro na requisição LangFlow: {response.status_code} - {response.text}"
+                logger.error(error_msg)
+                raise HTTPException(
+                    status_code=status.HTTP_502_BAD_GATEWAY,
+                    detail=f"Erro no serviço de IA: {response.status_code}"
                 )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.info(f"Resposta recebida do LangFlow - Flow: {flow_id}")
-                    return result
-                else:
-                    error_msg = f"Erro na requisição LangFlow: {response.status_code} - {response.text}"
-                    logger.error(error_msg)
-                    raise HTTPException(
-                        status_code=status.HTTP_502_BAD_GATEWAY,
-                        detail=f"Erro no serviço de IA: {response.status_code}"
-                    )
                     
         except httpx.TimeoutException:
             logger.error(f"Timeout na requisição LangFlow - Flow: {flow_id}")
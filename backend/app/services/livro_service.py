@@ -1,17 +1,31 @@
 from typing import Optional, List, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_, func
+from sqlalchemy import select, insert, update, and_, or_, func
 from sqlalchemy.orm import selectinload
 from fastapi import HTTPException, status, UploadFile
 from app.models.livro import Livro, StatusLivro
 from app.models.ato import Ato
+from app.db.base import LIVRO_HAS_PDF_SHA256
 from app.schemas.livro import LivroCreate, LivroUpdate, AtoProcessado
 from app.core.logging import logger
 from datetime import datetime
+import asyncio
+import hashlib
 import uuid
 import os
 
 
+def _sha256_file(file_path: str) -> str:
+    """Calcula o SHA-256 de um arquivo (executar fora do event loop)."""
+    with open(file_path, "rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+# Statements base da listagem, construídos uma única vez na importação
+_LIST_BASE = select(Livro).order_by(Livro.ano.desc(), Livro.numero.desc())
+_COUNT_BASE = select(func.count(Livro.id))
+
+
 class LivroService:
     """Serviço para gerenciamento de livros notariais."""
     
@@ -45,7 +59,6 @@ class LivroService:
             
             session.add(livro)
             await session.commit()
-            await session.refresh(livro)
             
             logger.info(f"Livro criado: {livro.identificacao}")
             
@@ -73,6 +86,27 @@ class LivroService:
             logger.error(f"Erro ao buscar livro por ID {livro_id}: {str(e)}")
             return None
     
+    @staticmethod
+    async def get_livro_by_id_with_relations(
+        session: AsyncSession,
+        livro_id: int,
+        *load_options
+    ) -> Optional[Livro]:
+        """Busca livro por ID carregando antecipadamente os relacionamentos.
+        
+        Recebe opções como selectinload(Livro.atos), evitando lazy loads
+        (N+1) ao acessar os relacionamentos depois.
+        """
+        try:
+            stmt = select(Livro).where(Livro.id == livro_id)
+            if load_options:
+                stmt = stmt.options(*load_options)
+            result = await session.execute(stmt)
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.error(f"Erro ao buscar livro por ID {livro_id}: {str(e)}")
+            return None
+    
     @staticmethod
     async def get_livro_by_numero_ano(
         session: AsyncSession, 
@@ -143,7 +177,6 @@ class LivroService:
             livro.update_from_dict(update_data)
             
             await session.commit()
-            await session.refresh(livro)
             
             logger.info(f"Livro atualizado: {livro.identificacao}")
             
@@ -168,13 +201,6 @@ class LivroService:
     ) -> Livro:
         """Faz upload do PDF do livro."""
         try:
-            livro = await LivroService.get_livro_by_id(session, livro_id)
-            if not livro:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Livro não encontrado"
-                )
-            
             # Validar arquivo
             if not pdf_file.filename.lower().endswith('.pdf'):
                 raise HTTPException(
@@ -184,25 +210,51 @@ class LivroService:
             
             # Gerar nome único para o arquivo
             file_extension = os.path.splitext(pdf_file.filename)[1]
-            unique_filename = f"livro_{livro.id}_{uuid.uuid4().hex}{file_extension}"
+            unique_filename = f"livro_{livro_id}_{uuid.uuid4().hex}{file_extension}"
             file_path = os.path.join(upload_dir, unique_filename)
             
-            # Criar diretório se não existir
-            os.makedirs(upload_dir, exist_ok=True)
+            # Diretório padrão é criado na inicialização; subdiretórios
+            # dinâmicos são criados fora do event loop
+            if not os.path.isdir(upload_dir):
+                await asyncio.to_thread(os.makedirs, upload_dir, exist_ok=True)
             
-            # Salvar arquivo
+            # Salvar arquivo antes de tocar no banco: se a escrita falhar,
+            # nenhuma alteração é feita no livro
             with open(file_path, "wb") as buffer:
                 content = await pdf_file.read()
                 buffer.write(content)
             
-            # Atualizar livro
-            livro.caminho_pdf = file_path
-            livro.nome_arquivo_original = pdf_file.filename
-            livro.tamanho_arquivo = len(content)
-            livro.status_processamento = "pendente"
+            valores = {
+                "caminho_pdf": file_path,
+                "nome_arquivo_original": pdf_file.filename,
+                "tamanho_arquivo": len(content),
+                "status_processamento": "pendente"
+            }
+            
+            # Hash de integridade calculado em thread (OpenSSL libera o GIL);
+            # só gravado depois que a coluna existir no modelo
+            if LIVRO_HAS_PDF_SHA256:
+                valores["pdf_sha256"] = await asyncio.to_thread(_sha256_file, file_path)
+            
+            # Atualizar livro em um único UPDATE ... RETURNING
+            stmt = (
+                update(Livro)
+                .where(Livro.id == livro_id)
+                .values(**valores)
+                .returning(Livro)
+            )
+            result = await session.execute(stmt)
+            livro = result.scalar_one_or_none()
+            
+            if not livro:
+                # Remover arquivo órfão
+                os.remove(file_path)
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Livro não encontrado"
+                )
             
             await session.commit()
-            await session.refresh(livro)
             
             logger.info(f"PDF carregado para livro {livro.identificacao}: {file_path}")
             
@@ -249,7 +301,6 @@ class LivroService:
                 livro.data_processamento = datetime.now()
             
             await session.commit()
-            await session.refresh(livro)
             
             logger.info(f"Status de processamento atualizado para {livro.identificacao}: {status}")
             
@@ -282,28 +333,30 @@ class LivroService:
             
             atos_criados = []
             
-            for ato_data in atos_data:
-                ato = Ato(
-                    livro_id=livro.id,
-                    numero_ato=ato_data.numero_ato,
-                    tipo_ato=ato_data.tipo_ato,
-                    data_ato=ato_data.data_ato,
-                    conteudo_original=ato_data.conteudo_original,
-                    conteudo_markdown=ato_data.conteudo_markdown,
-                    partes=ato_data.partes,
-                    dados_extraidos=ato_data.dados_extraidos,
-                    status_processamento_ia="concluido"
+            # Um único INSERT ... RETURNING para todos os atos; o flush do
+            # session.add emitiria um INSERT por ato
+            if atos_data:
+                result = await session.scalars(
+                    insert(Ato).returning(Ato),
+                    [
+                        {
+                            "livro_id": livro.id,
+                            "numero_ato": ato_data.numero_ato,
+                            "tipo_ato": ato_data.tipo_ato,
+                            "data_ato": ato_data.data_ato,
+                            "conteudo_original": ato_data.conteudo_original,
+                            "conteudo_markdown": ato_data.conteudo_markdown,
+                            "partes": ato_data.partes,
+                            "dados_extraidos": ato_data.dados_extraidos,
+                            "status_processamento_ia": "concluido"
+                        }
+                        for ato_data in atos_data
+                    ]
                 )
-                
-                session.add(ato)
-                atos_criados.append(ato)
+                atos_criados = list(result.all())
             
             await session.commit()
             
-            # Refresh dos atos criados
-            for ato in atos_criados:
-                await session.refresh(ato)
-            
             logger.info(f"Adicionados {len(atos_criados)} atos ao livro {livro.identificacao}")
             
             return atos_criados
@@ -330,9 +383,6 @@ class LivroService:
     ) -> tuple[List[Livro], int]:
         """Lista livros com filtros e paginação."""
         try:
-            # Construir query base
-            query = select(Livro)
-            
             # Aplicar filtros
             conditions = []
             
@@ -355,21 +405,18 @@ class LivroService:
                     )
                 )
             
+            query = _LIST_BASE
+            count_query = _COUNT_BASE
             if conditions:
                 query = query.where(and_(*conditions))
-            
-            # Contar total
-            count_query = select(func.count(Livro.id))
-            if conditions:
                 count_query = count_query.where(and_(*conditions))
             
+            # Contar total
             count_result = await session.execute(count_query)
             total = count_result.scalar()
             
-            # Aplicar paginação e ordenação
-            query = query.order_by(Livro.ano.desc(), Livro.numero.desc()).offset(skip).limit(limit)
-            
-            result = await session.execute(query)
+            # Aplicar paginação
+            result = await session.execute(query.offset(skip).limit(limit))
             livros = result.scalars().all()
             
             return list(livros), total
@@ -452,18 +499,21 @@ class LivroService:
     ) -> bool:
         """Exclui um livro (soft delete)."""
         try:
-            livro = await LivroService.get_livro_by_id(session, livro_id)
-            if not livro:
+            # Buscar livro e total de atos associados em uma única consulta
+            result = await session.execute(
+                select(Livro, func.count(Ato.id))
+                .outerjoin(Ato, Ato.livro_id == Livro.id)
+                .where(Livro.id == livro_id)
+                .group_by(Livro.id)
+            )
+            row = result.one_or_none()
+            if not row:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Livro não encontrado"
                 )
             
-            # Verificar se tem atos associados
-            atos_result = await session.execute(
-                select(func.count(Ato.id)).where(Ato.livro_id == livro_id)
-            )
-            total_atos = atos_result.scalar()
+            livro, total_atos = row
             
             if total_atos > 0:
                 raise HTTPException(
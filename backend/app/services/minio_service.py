@@ -1,18 +1,145 @@
-from typing import Optional, BinaryIO, Dict, Any
-from fastapi import HTTPException, status, UploadFile
+from typing import Optional, BinaryIO, Dict, Any, List, Iterator, AsyncIterator, Tuple
+from fastapi import UploadFile
 from app.core.config import settings
 from app.core.logging import logger
+from app.core.cache import get_redis
 import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from botocore.exceptions import BotoCoreError, ClientError
 from botocore.config import Config
+from botocore.response import StreamingBody
+from redis.exceptions import RedisError
+from boto3.s3.transfer import TransferConfig, create_transfer_manager
+from cachetools import TTLCache
+from collections import Counter, deque
 from datetime import datetime, timedelta
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+import asyncio
+import hashlib
+import io
+import itertools
+import queue
+import secrets
+import threading
+import time
 import os
 import mimetypes
 
 
+# Tamanho de cada parte do upload multipart (mínimo do S3 é 5 MB)
+_PART_SIZE = 8 * 1024 * 1024
+# Número máximo de buffers de upload mantidos pelo processo
+_BUF_POOL_SIZE = 32
+# Acima deste tamanho o upload deve ir direto ao MinIO via URL pré-assinada
+_DIRECT_UPLOAD_THRESHOLD = 32 * 1024 * 1024
+# Acima deste tamanho o streaming busca faixas (Range) em paralelo
+_PARALLEL_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+_PARALLEL_DOWNLOAD_CONCURRENCY = 8
+# Threads dedicadas às chamadas bloqueantes do boto3, para não disputar o
+# executor padrão do event loop com o restante da aplicação
+_MINIO_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="minio")
+# Limite de chaves por chamada delete_objects
+_DELETE_BATCH_SIZE = 1000
+# Configuração única do gerenciador de transferências (downloads e cópias)
+_TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=_PART_SIZE,
+    multipart_chunksize=_PART_SIZE,
+    max_concurrency=8,
+    use_threads=True
+)
+# Tipos MIME das extensões mais comuns, sem passar pelo módulo mimetypes
+_MIME_FAST = {
+    '.pdf': 'application/pdf',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.doc': 'application/msword',
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.txt': 'text/plain',
+    '.zip': 'application/zip',
+    '.json': 'application/json'
+}
+
+
+def _guess_content_type(filename: str) -> str:
+    """Detecta o tipo MIME pelo nome do arquivo."""
+    return (
+        _MIME_FAST.get(os.path.splitext(filename)[1].lower())
+        or mimetypes.guess_type(filename)[0]
+        or 'application/octet-stream'
+    )
+
+
+class _ViewReader(io.RawIOBase):
+    """Arquivo somente leitura sobre um memoryview, sem copiar o buffer.
+    
+    Usado como corpo das partes enviadas: o boto3 lê em blocos e volta ao
+    início (seek) ao repetir uma requisição.
+    """
+    
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+    
+    def __len__(self) -> int:
+        return len(self._view)
+    
+    def readable(self) -> bool:
+        return True
+    
+    def seekable(self) -> bool:
+        return True
+    
+    def tell(self) -> int:
+        return self._pos
+    
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = min(max(offset, 0), len(self._view))
+        return self._pos
+    
+    def read(self, size: int = -1) -> bytes:
+        end = len(self._view) if size is None or size < 0 else min(self._pos + size, len(self._view))
+        data = bytes(self._view[self._pos:end])
+        self._pos = max(end, self._pos)
+        return data
+    
+    def readinto(self, b) -> int:
+        n = min(len(b), len(self._view) - self._pos)
+        b[:n] = self._view[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+class MinIOError(Exception):
+    """Erro base do serviço de armazenamento."""
+
+
+class MinIONotFoundError(MinIOError):
+    """Bucket ou objeto inexistente."""
+
+
+class MinIOBackendError(MinIOError):
+    """Falha de comunicação ou erro retornado pelo MinIO."""
+
+
+# Códigos de erro do S3 que indicam recurso inexistente
+_NOT_FOUND_CODES = frozenset({'404', 'NoSuchKey', 'NoSuchBucket', 'NotFound'})
+
+
 class MinIOService:
-    """Serviço para gerenciamento de arquivos no MinIO."""
+    """Serviço para gerenciamento de arquivos no MinIO.
+    
+    Os métodos não dependem do FastAPI: falhas do boto3 são convertidas em
+    MinIOError, cujo mapeamento para HTTP fica em app.api.deps.
+    """
+    
+    # Sequência por processo e prefixo de data reaproveitado dentro do mesmo segundo
+    _seq = itertools.count()
+    _date_cache = (0, '')
     
     def __init__(self):
         """Inicializa o cliente MinIO."""
@@ -25,69 +152,202 @@ class MinIOService:
                 aws_secret_access_key=settings.MINIO_SECRET_KEY,
                 config=Config(
                     signature_version='s3v4',
-                    region_name='us-east-1'  # MinIO usa região padrão
+                    region_name='us-east-1',  # MinIO usa região padrão
+                    # Pool de conexões persistentes compartilhado entre requisições
+                    max_pool_connections=settings.MINIO_POOL_SIZE,
+                    tcp_keepalive=True,
+                    retries={'mode': 'adaptive', 'max_attempts': 3}
                 ),
                 verify=False  # Para desenvolvimento local
             )
             
+            # Gerenciador de transferências compartilhado: um único pool de
+            # threads limita as partes simultâneas em todo o processo
+            self._transfer = create_transfer_manager(self.s3_client, _TRANSFER_CONFIG)
+            
             # Bucket padrão para livros
             self.default_bucket = "actnexus-livros"
             
+            # Cache de estatísticas por bucket (varredura completa é O(N))
+            self._stats_cache = TTLCache(maxsize=32, ttl=60)
+            
+            # URLs pré-assinadas já geradas; a chave inclui uma janela de tempo
+            # para que a URL devolvida ainda tenha ao menos 3/4 da validade
+            self._presigned_cache = TTLCache(maxsize=4096, ttl=3600)
+            
+            # Respostas de head_object por (bucket, objeto); invalidadas nas
+            # escritas feitas por este serviço. Acessado só pelo event loop.
+            self._head_cache = TTLCache(maxsize=8192, ttl=5)
+            
+            # Buckets já confirmados neste processo (evita head_bucket a cada upload)
+            self._known_buckets: set[str] = set()
+            
+            # Pool de buffers reutilizados pelos uploads multipart; a memória
+            # residente fica limitada a _BUF_POOL_SIZE * _PART_SIZE
+            self._buf_pool = queue.LifoQueue(maxsize=_BUF_POOL_SIZE)
+            self._buf_count = 0
+            self._buf_lock = threading.Lock()
+            
             logger.info("Cliente MinIO inicializado com sucesso")
             
         except Exception as e:
             logger.error(f"Erro ao inicializar cliente MinIO: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro ao conectar com o serviço de armazenamento"
+            raise MinIOBackendError("Erro ao conectar com o serviço de armazenamento") from e
+    
+    async def _run(self, fn, *args, **kwargs):
+        """Executa uma chamada bloqueante do boto3 fora do event loop.
+        
+        Erros do boto3 são convertidos em MinIOError.
+        """
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                _MINIO_POOL, partial(fn, *args, **kwargs)
             )
+        except ClientError as e:
+            if e.response['Error']['Code'] in _NOT_FOUND_CODES:
+                raise MinIONotFoundError("Arquivo não encontrado") from e
+            logger.error(f"Erro no MinIO ({getattr(fn, '__name__', fn)}): {str(e)}")
+            raise MinIOBackendError(f"Erro no serviço de armazenamento: {str(e)}") from e
+        except BotoCoreError as e:
+            logger.error(f"Erro de comunicação com o MinIO ({getattr(fn, '__name__', fn)}): {str(e)}")
+            raise MinIOBackendError(f"Erro no serviço de armazenamento: {str(e)}") from e
+    
+    def _acquire_buf(self) -> bytearray:
+        """Obtém um buffer do pool, alocando sob demanda até o limite."""
+        try:
+            return self._buf_pool.get_nowait()
+        except queue.Empty:
+            with self._buf_lock:
+                if self._buf_count < _BUF_POOL_SIZE:
+                    self._buf_count += 1
+                    return bytearray(_PART_SIZE)
+            # Limite atingido: aguardar um buffer ser devolvido
+            return self._buf_pool.get()
+    
+    def _release_buf(self, buf: bytearray) -> None:
+        """Devolve um buffer ao pool."""
+        self._buf_pool.put_nowait(buf)
+    
+    @staticmethod
+    def _read_part(fileobj: BinaryIO, view: memoryview) -> int:
+        """Preenche o buffer com o próximo trecho do arquivo."""
+        total = 0
+        while total < len(view):
+            read = fileobj.readinto(view[total:])
+            if not read:
+                break
+            total += read
+        return total
+    
+    def _upload_stream(
+        self,
+        fileobj: BinaryIO,
+        bucket_name: str,
+        object_name: str,
+        content_type: str,
+        metadata: Dict[str, str]
+    ) -> str:
+        """Envia um arquivo em partes usando buffers do pool (bloqueante).
+        
+        Retorna o SHA-256 do conteúdo, calculado sobre as mesmas partes
+        enviadas (sem uma segunda leitura do arquivo).
+        """
+        digest = hashlib.sha256()
+        buf = self._acquire_buf()
+        try:
+            view = memoryview(buf)
+            read = self._read_part(fileobj, view)
+            digest.update(view[:read])
+            
+            # Arquivo cabe em uma única parte: PUT simples
+            if read < _PART_SIZE:
+                self.s3_client.put_object(
+                    Bucket=bucket_name,
+                    Key=object_name,
+                    Body=_ViewReader(view[:read]),
+                    ContentType=content_type,
+                    Metadata=metadata
+                )
+                return digest.hexdigest()
+            
+            upload_id = self.s3_client.create_multipart_upload(
+                Bucket=bucket_name,
+                Key=object_name,
+                ContentType=content_type,
+                Metadata=metadata
+            )['UploadId']
+            
+            try:
+                parts = []
+                part_number = 1
+                while read:
+                    response = self.s3_client.upload_part(
+                        Bucket=bucket_name,
+                        Key=object_name,
+                        PartNumber=part_number,
+                        UploadId=upload_id,
+                        Body=_ViewReader(view[:read])
+                    )
+                    parts.append({'ETag': response['ETag'], 'PartNumber': part_number})
+                    
+                    if read < _PART_SIZE:
+                        break
+                    part_number += 1
+                    read = self._read_part(fileobj, view)
+                    digest.update(view[:read])
+                
+                self.s3_client.complete_multipart_upload(
+                    Bucket=bucket_name,
+                    Key=object_name,
+                    UploadId=upload_id,
+                    MultipartUpload={'Parts': parts}
+                )
+                return digest.hexdigest()
+            except Exception:
+                self.s3_client.abort_multipart_upload(
+                    Bucket=bucket_name, Key=object_name, UploadId=upload_id
+                )
+                raise
+        finally:
+            self._release_buf(buf)
     
     async def ensure_bucket_exists(self, bucket_name: str) -> bool:
         """Garante que o bucket existe, criando se necessário."""
+        if bucket_name in self._known_buckets:
+            return True
+        
         try:
             # Verificar se o bucket existe
-            self.s3_client.head_bucket(Bucket=bucket_name)
+            await self._run(self.s3_client.head_bucket, Bucket=bucket_name)
             logger.debug(f"Bucket '{bucket_name}' já existe")
-            return True
-            
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
             
-            if error_code == '404':
-                # Bucket não existe, criar
-                try:
-                    self.s3_client.create_bucket(Bucket=bucket_name)
-                    logger.info(f"Bucket '{bucket_name}' criado com sucesso")
-                    return True
-                except ClientError as create_error:
-                    logger.error(f"Erro ao criar bucket '{bucket_name}': {str(create_error)}")
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=f"Erro ao criar bucket: {str(create_error)}"
-                    )
-            else:
-                logger.error(f"Erro ao verificar bucket '{bucket_name}': {str(e)}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Erro ao acessar bucket: {str(e)}"
-                )
+        except MinIONotFoundError:
+            # Bucket não existe, criar
+            await self._run(self.s3_client.create_bucket, Bucket=bucket_name)
+            logger.info(f"Bucket '{bucket_name}' criado com sucesso")
+        
+        self._known_buckets.add(bucket_name)
+        return True
     
-    def _generate_object_name(self, original_filename: str, prefix: str = "") -> str:
+    @classmethod
+    def _generate_object_name(cls, original_filename: str, prefix: str = "") -> str:
         """Gera um nome único para o objeto."""
         # Extrair extensão do arquivo
         _, ext = os.path.splitext(original_filename)
         
-        # Gerar UUID único
-        unique_id = str(uuid.uuid4())
+        # Timestamp formatado no máximo uma vez por segundo
+        now = int(time.time())
+        if now != cls._date_cache[0]:
+            cls._date_cache = (now, time.strftime("%Y%m%d_%H%M%S", time.localtime(now)))
         
-        # Adicionar timestamp para garantir unicidade
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        # Contador do processo + sufixo aleatório garantem unicidade entre workers
+        unique_id = f"{cls._date_cache[1]}_{next(cls._seq):08x}_{secrets.token_hex(4)}"
         
         # Construir nome do objeto
         if prefix:
-            object_name = f"{prefix}/{timestamp}_{unique_id}{ext}"
+            object_name = f"{prefix}/{unique_id}{ext}"
         else:
-            object_name = f"{timestamp}_{unique_id}{ext}"
+            object_name = f"{unique_id}{ext}"
         
         return object_name
     
@@ -99,62 +359,81 @@ class MinIOService:
         prefix: str = ""
     ) -> Dict[str, Any]:
         """Faz upload de um arquivo para o MinIO."""
-        try:
-            # Usar bucket padrão se não especificado
-            if not bucket_name:
-                bucket_name = self.default_bucket
-            
-            # Garantir que o bucket existe
-            await self.ensure_bucket_exists(bucket_name)
-            
-            # Gerar nome do objeto se não fornecido
-            if not object_name:
-                object_name = self._generate_object_name(file.filename, prefix)
-            
-            # Detectar tipo MIME
-            content_type = file.content_type
-            if not content_type:
-                content_type, _ = mimetypes.guess_type(file.filename)
-                if not content_type:
-                    content_type = 'application/octet-stream'
-            
-            # Ler conteúdo do arquivo
-            file_content = await file.read()
-            file_size = len(file_content)
-            
-            # Metadados do arquivo
-            metadata = {
-                'original-filename': file.filename,
-                'upload-timestamp': datetime.now().isoformat(),
-                'file-size': str(file_size)
-            }
-            
-            # Fazer upload
-            self.s3_client.put_object(
-                Bucket=bucket_name,
-                Key=object_name,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata=metadata
-            )
-            
-            logger.info(f"Arquivo '{file.filename}' enviado como '{object_name}' no bucket '{bucket_name}'")
-            
-            return {
-                "bucket_name": bucket_name,
-                "object_name": object_name,
-                "original_filename": file.filename,
-                "file_size": file_size,
-                "content_type": content_type,
-                "upload_timestamp": datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Erro ao fazer upload do arquivo '{file.filename}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao fazer upload do arquivo: {str(e)}"
+        return await self.upload_fileobj(
+            fileobj=file.file,
+            filename=file.filename,
+            bucket_name=bucket_name,
+            object_name=object_name,
+            content_type=file.content_type,
+            prefix=prefix
+        )
+    
+    async def upload_fileobj(
+        self,
+        fileobj: BinaryIO,
+        filename: str,
+        bucket_name: Optional[str] = None,
+        object_name: Optional[str] = None,
+        content_type: Optional[str] = None,
+        prefix: str = ""
+    ) -> Dict[str, Any]:
+        """Faz upload de um arquivo aberto (com seek) para o MinIO em partes.
+        
+        O conteúdo é lido direto do arquivo para buffers do pool, sem
+        carregá-lo inteiro em memória.
+        """
+        # Usar bucket padrão se não especificado
+        if not bucket_name:
+            bucket_name = self.default_bucket
+        
+        # Garantir que o bucket existe
+        await self.ensure_bucket_exists(bucket_name)
+        
+        # Gerar nome do objeto se não fornecido
+        if not object_name:
+            object_name = self._generate_object_name(filename, prefix)
+        
+        # Detectar tipo MIME
+        if not content_type:
+            content_type = _guess_content_type(filename)
+        
+        # Obter tamanho sem carregar o arquivo em memória
+        fileobj.seek(0, os.SEEK_END)
+        file_size = fileobj.tell()
+        fileobj.seek(0)
+        
+        if file_size > _DIRECT_UPLOAD_THRESHOLD:
+            logger.warning(
+                f"Upload de '{filename}' ({file_size} bytes) passando pelo backend; "
+                f"prefira initiate_upload/finalize_upload para arquivos grandes"
             )
+        
+        # Metadados do arquivo (data e tamanho já vêm em LastModified/ContentLength)
+        metadata = {'original-filename': filename}
+        
+        # Fazer upload em streaming (multipart com buffers reutilizados) fora do event loop
+        sha256 = await self._run(
+            self._upload_stream,
+            fileobj,
+            bucket_name,
+            object_name,
+            content_type,
+            metadata
+        )
+        
+        self._head_cache.pop((bucket_name, object_name), None)
+        
+        logger.info(f"Arquivo '{filename}' enviado como '{object_name}' no bucket '{bucket_name}'")
+        
+        return {
+            "bucket_name": bucket_name,
+            "object_name": object_name,
+            "original_filename": filename,
+            "file_size": file_size,
+            "content_type": content_type,
+            "sha256": sha256,
+            "upload_timestamp": datetime.now().isoformat()
+        }
     
     async def upload_file_content(
         self,
@@ -166,275 +445,476 @@ class MinIOService:
         prefix: str = ""
     ) -> Dict[str, Any]:
         """Faz upload de conteúdo de arquivo para o MinIO."""
-        try:
-            # Usar bucket padrão se não especificado
-            if not bucket_name:
-                bucket_name = self.default_bucket
-            
-            # Garantir que o bucket existe
-            await self.ensure_bucket_exists(bucket_name)
-            
-            # Gerar nome do objeto se não fornecido
-            if not object_name:
-                object_name = self._generate_object_name(filename, prefix)
-            
-            # Detectar tipo MIME
-            if not content_type:
-                content_type, _ = mimetypes.guess_type(filename)
-                if not content_type:
-                    content_type = 'application/octet-stream'
-            
-            file_size = len(file_content)
-            
-            # Metadados do arquivo
-            metadata = {
-                'original-filename': filename,
-                'upload-timestamp': datetime.now().isoformat(),
-                'file-size': str(file_size)
-            }
-            
-            # Fazer upload
-            self.s3_client.put_object(
-                Bucket=bucket_name,
-                Key=object_name,
-                Body=file_content,
-                ContentType=content_type,
-                Metadata=metadata
-            )
-            
-            logger.info(f"Conteúdo do arquivo '{filename}' enviado como '{object_name}' no bucket '{bucket_name}'")
-            
-            return {
-                "bucket_name": bucket_name,
-                "object_name": object_name,
-                "original_filename": filename,
-                "file_size": file_size,
-                "content_type": content_type,
-                "upload_timestamp": datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            logger.error(f"Erro ao fazer upload do conteúdo do arquivo '{filename}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao fazer upload do arquivo: {str(e)}"
-            )
+        # Usar bucket padrão se não especificado
+        if not bucket_name:
+            bucket_name = self.default_bucket
+        
+        # Garantir que o bucket existe
+        await self.ensure_bucket_exists(bucket_name)
+        
+        # Gerar nome do objeto se não fornecido
+        if not object_name:
+            object_name = self._generate_object_name(filename, prefix)
+        
+        # Detectar tipo MIME
+        if not content_type:
+            content_type = _guess_content_type(filename)
+        
+        file_size = len(file_content)
+        
+        # Metadados do arquivo (data e tamanho já vêm em LastModified/ContentLength)
+        metadata = {'original-filename': filename}
+        
+        # Fazer upload
+        await self._run(
+            self.s3_client.put_object,
+            Bucket=bucket_name,
+            Key=object_name,
+            Body=file_content,
+            ContentType=content_type,
+            Metadata=metadata
+        )
+        
+        self._head_cache.pop((bucket_name, object_name), None)
+        
+        logger.info(f"Conteúdo do arquivo '{filename}' enviado como '{object_name}' no bucket '{bucket_name}'")
+        
+        return {
+            "bucket_name": bucket_name,
+            "object_name": object_name,
+            "original_filename": filename,
+            "file_size": file_size,
+            "content_type": content_type,
+            "upload_timestamp": datetime.now().isoformat()
+        }
+    
+    async def initiate_upload(
+        self,
+        filename: str,
+        bucket_name: Optional[str] = None,
+        prefix: str = "",
+        content_type: Optional[str] = None,
+        expiration: int = 3600
+    ) -> Dict[str, Any]:
+        """Gera uma URL PUT pré-assinada para o cliente enviar o arquivo direto ao MinIO."""
+        if not bucket_name:
+            bucket_name = self.default_bucket
+        
+        await self.ensure_bucket_exists(bucket_name)
+        
+        object_name = self._generate_object_name(filename, prefix)
+        
+        if not content_type:
+            content_type = _guess_content_type(filename)
+        
+        url = await self.create_presigned_url(
+            bucket_name=bucket_name,
+            object_name=object_name,
+            expiration=expiration,
+            method='PUT'
+        )
+        
+        return {
+            "url": url,
+            "method": "PUT",
+            "bucket_name": bucket_name,
+            "object_name": object_name,
+            "expires_in_seconds": expiration,
+            "headers": {"Content-Type": content_type}
+        }
     
-    def create_presigned_url(
+    async def finalize_upload(
+        self,
+        bucket_name: str,
+        object_name: str,
+        original_filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Confirma um upload direto, obtendo tamanho e ETag reais do objeto."""
+        file_info = await self.get_file_info(bucket_name, object_name)
+        last_modified = file_info["last_modified"]
+        
+        return {
+            "bucket_name": bucket_name,
+            "object_name": object_name,
+            "original_filename": original_filename or os.path.basename(object_name),
+            "file_size": file_info["file_size"],
+            "content_type": file_info["content_type"],
+            "etag": file_info["etag"],
+            "upload_timestamp": last_modified.isoformat() if last_modified else datetime.now().isoformat()
+        }
+    
+    async def create_presigned_url(
         self,
         bucket_name: str,
         object_name: str,
         expiration: int = 3600,
-        method: str = 'GET'
+        method: str = 'GET',
+        refresh: bool = False
     ) -> str:
         """Cria uma URL pré-assinada para acesso ao arquivo."""
-        try:
-            # Mapear método HTTP para operação S3
-            operation_map = {
-                'GET': 'get_object',
-                'PUT': 'put_object',
-                'DELETE': 'delete_object'
-            }
-            
-            operation = operation_map.get(method.upper(), 'get_object')
-            
-            # Gerar URL pré-assinada
-            presigned_url = self.s3_client.generate_presigned_url(
-                operation,
-                Params={'Bucket': bucket_name, 'Key': object_name},
-                ExpiresIn=expiration
-            )
-            
-            logger.debug(f"URL pré-assinada criada para '{object_name}' (expiração: {expiration}s)")
-            
-            return presigned_url
-            
-        except Exception as e:
-            logger.error(f"Erro ao criar URL pré-assinada para '{object_name}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao gerar URL de acesso: {str(e)}"
+        window = max(expiration // 4, 1)
+        cache_key = (bucket_name, object_name, method.upper(), expiration, int(time.time()) // window)
+        cached_url = None if refresh else self._presigned_cache.get(cache_key)
+        if cached_url is not None:
+            return cached_url
+        
+        # Mapear método HTTP para operação S3
+        operation_map = {
+            'GET': 'get_object',
+            'PUT': 'put_object',
+            'DELETE': 'delete_object'
+        }
+        
+        operation = operation_map.get(method.upper(), 'get_object')
+        
+        # Gerar URL pré-assinada
+        presigned_url = self.s3_client.generate_presigned_url(
+            operation,
+            Params={'Bucket': bucket_name, 'Key': object_name},
+            ExpiresIn=expiration
+        )
+        self._presigned_cache[cache_key] = presigned_url
+        
+        logger.debug(f"URL pré-assinada criada para '{object_name}' (expiração: {expiration}s)")
+        
+        return presigned_url
+    
+    async def get_cached_presigned_url(
+        self,
+        bucket_name: str,
+        object_name: str,
+        expiration: int = 3600,
+        method: str = 'GET',
+        refresh: bool = False
+    ) -> str:
+        """Cria uma URL pré-assinada reaproveitando a guardada no Redis.
+        
+        A URL fica no Redis por expiration - 300s, então sempre sobram ao
+        menos 5 minutos de validade. A chave inclui a expiração: uma URL
+        curta nunca atende um pedido de validade maior. Sem Redis, equivale
+        a create_presigned_url.
+        """
+        redis = get_redis()
+        ttl = expiration - 300
+        if redis is None or ttl <= 0:
+            return await self.create_presigned_url(
+                bucket_name, object_name, expiration, method, refresh=refresh
             )
+        
+        key = f"presign:{method.upper()}:{expiration}:{bucket_name}:{object_name}"
+        
+        if not refresh:
+            try:
+                cached_url = await redis.get(key)
+                if cached_url:
+                    return cached_url
+            except RedisError as e:
+                logger.warning(f"Erro ao consultar URL pré-assinada no cache: {str(e)}")
+        
+        presigned_url = await self.create_presigned_url(
+            bucket_name, object_name, expiration, method, refresh=refresh
+        )
+        
+        try:
+            await redis.setex(key, ttl, presigned_url)
+        except RedisError as e:
+            logger.warning(f"Erro ao armazenar URL pré-assinada no cache: {str(e)}")
+        
+        return presigned_url
     
-    def get_file_info(
+    async def get_file_info(
         self,
         bucket_name: str,
         object_name: str
     ) -> Dict[str, Any]:
-        """Obtém informações sobre um arquivo."""
-        try:
-            response = self.s3_client.head_object(Bucket=bucket_name, Key=object_name)
-            
-            return {
-                "bucket_name": bucket_name,
-                "object_name": object_name,
-                "file_size": response.get('ContentLength', 0),
-                "content_type": response.get('ContentType', ''),
-                "last_modified": response.get('LastModified', '').isoformat() if response.get('LastModified') else '',
-                "etag": response.get('ETag', '').strip('"'),
-                "metadata": response.get('Metadata', {})
-            }
-            
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == '404':
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Arquivo não encontrado"
-                )
-            else:
-                logger.error(f"Erro ao obter informações do arquivo '{object_name}': {str(e)}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Erro ao acessar arquivo: {str(e)}"
-                )
+        """Obtém informações sobre um arquivo.
+        
+        last_modified é devolvido como datetime; a serialização fica com o
+        ORJSONResponse. O resultado fica em cache por alguns segundos; cada
+        chamada recebe uma cópia, para que alterações do chamador não
+        vazem para as demais requisições.
+        """
+        cache_key = (bucket_name, object_name)
+        cached_info = self._head_cache.get(cache_key)
+        if cached_info is not None:
+            return dict(cached_info, metadata=dict(cached_info["metadata"]))
+        
+        response = await self._run(
+            self.s3_client.head_object, Bucket=bucket_name, Key=object_name
+        )
+        
+        file_info = {
+            "bucket_name": bucket_name,
+            "object_name": object_name,
+            "file_size": response.get('ContentLength', 0),
+            "content_type": response.get('ContentType', ''),
+            "last_modified": response.get('LastModified'),
+            "etag": response.get('ETag', '')[1:-1],
+            "metadata": response.get('Metadata', {})
+        }
+        self._head_cache[cache_key] = dict(file_info, metadata=dict(file_info["metadata"]))
+        
+        return file_info
     
-    def download_file(
+    async def download_file(
         self,
         bucket_name: str,
         object_name: str
     ) -> bytes:
         """Baixa um arquivo do MinIO."""
+        def _download() -> bytes:
+            buffer = io.BytesIO()
+            self._transfer.download(bucket_name, object_name, buffer).result()
+            return buffer.getvalue()
+        
+        file_content = await self._run(_download)
+        
+        logger.debug(f"Arquivo '{object_name}' baixado do bucket '{bucket_name}'")
+        
+        return file_content
+    
+    async def open_file(
+        self,
+        bucket_name: str,
+        object_name: str
+    ) -> StreamingBody:
+        """Abre um arquivo do MinIO para leitura em streaming."""
+        response = await self._run(
+            self.s3_client.get_object, Bucket=bucket_name, Key=object_name
+        )
+        return response['Body']
+    
+    async def iter_file(
+        self,
+        bucket_name: str,
+        object_name: str,
+        chunk_size: int = 1024 * 1024
+    ) -> AsyncIterator[bytes]:
+        """Abre um arquivo e devolve um iterador assíncrono sobre seus blocos.
+        
+        O objeto é aberto antes do retorno, então erros (ex.: 404) surgem
+        aqui e não no meio da resposta em streaming. Objetos grandes são
+        lidos em faixas paralelas, entregues em ordem.
+        """
+        file_info = await self.get_file_info(bucket_name, object_name)
+        file_size = file_info["file_size"]
+        if file_size > _PARALLEL_DOWNLOAD_THRESHOLD:
+            return self._iter_ranges(bucket_name, object_name, file_size)
+        
+        body = await self.open_file(bucket_name, object_name)
+        return self._iter_body(body, chunk_size)
+    
+    async def _iter_body(self, body: StreamingBody, chunk_size: int) -> AsyncIterator[bytes]:
+        """Lê o corpo em blocos fora do event loop, fechando a conexão ao final."""
+        chunks = body.iter_chunks(chunk_size=chunk_size)
         try:
-            response = self.s3_client.get_object(Bucket=bucket_name, Key=object_name)
-            file_content = response['Body'].read()
-            
-            logger.debug(f"Arquivo '{object_name}' baixado do bucket '{bucket_name}'")
-            
-            return file_content
-            
-        except ClientError as e:
-            error_code = e.response['Error']['Code']
-            if error_code == '404':
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Arquivo não encontrado"
-                )
-            else:
-                logger.error(f"Erro ao baixar arquivo '{object_name}': {str(e)}")
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"Erro ao baixar arquivo: {str(e)}"
-                )
+            while True:
+                chunk = await self._run(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            body.close()
+    
+    async def _iter_ranges(
+        self,
+        bucket_name: str,
+        object_name: str,
+        file_size: int
+    ) -> AsyncIterator[bytes]:
+        """Baixa faixas de _PART_SIZE em paralelo e as entrega em ordem.
+        
+        No máximo _PARALLEL_DOWNLOAD_CONCURRENCY faixas ficam em memória.
+        """
+        def _fetch(start: int) -> bytes:
+            end = min(start + _PART_SIZE, file_size) - 1
+            response = self.s3_client.get_object(
+                Bucket=bucket_name, Key=object_name, Range=f"bytes={start}-{end}"
+            )
+            return response['Body'].read()
+        
+        offsets = iter(range(0, file_size, _PART_SIZE))
+        pending = deque(
+            asyncio.ensure_future(self._run(_fetch, start))
+            for start in itertools.islice(offsets, _PARALLEL_DOWNLOAD_CONCURRENCY)
+        )
+        try:
+            while pending:
+                chunk = await pending.popleft()
+                # Repor a fila antes de entregar o bloco, mantendo as conexões ocupadas
+                start = next(offsets, None)
+                if start is not None:
+                    pending.append(asyncio.ensure_future(self._run(_fetch, start)))
+                yield chunk
+        finally:
+            for task in pending:
+                task.cancel()
     
-    def delete_file(
+    async def delete_file(
         self,
         bucket_name: str,
         object_name: str
     ) -> bool:
         """Exclui um arquivo do MinIO."""
-        try:
-            self.s3_client.delete_object(Bucket=bucket_name, Key=object_name)
-            
-            logger.info(f"Arquivo '{object_name}' excluído do bucket '{bucket_name}'")
-            
-            return True
-            
-        except ClientError as e:
-            logger.error(f"Erro ao excluir arquivo '{object_name}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao excluir arquivo: {str(e)}"
+        await self._run(
+            self.s3_client.delete_object, Bucket=bucket_name, Key=object_name
+        )
+        self._head_cache.pop((bucket_name, object_name), None)
+        
+        logger.info(f"Arquivo '{object_name}' excluído do bucket '{bucket_name}'")
+        
+        return True
+    
+    async def delete_files(
+        self,
+        bucket_name: str,
+        object_names: List[str]
+    ) -> Dict[str, Any]:
+        """Exclui vários arquivos do MinIO em lotes de até 1000 chaves."""
+        errors = []
+        
+        for start in range(0, len(object_names), _DELETE_BATCH_SIZE):
+            batch = object_names[start:start + _DELETE_BATCH_SIZE]
+            for key in batch:
+                self._head_cache.pop((bucket_name, key), None)
+            response = await self._run(
+                self.s3_client.delete_objects,
+                Bucket=bucket_name,
+                Delete={
+                    'Objects': [{'Key': key} for key in batch],
+                    'Quiet': True
+                }
             )
+            errors.extend(response.get('Errors', []))
+        
+        logger.info(
+            f"{len(object_names) - len(errors)} arquivos excluídos do bucket '{bucket_name}'"
+            + (f" ({len(errors)} falhas)" if errors else "")
+        )
+        
+        return {
+            "bucket_name": bucket_name,
+            "deleted": len(object_names) - len(errors),
+            "errors": [
+                {"object_name": error.get('Key'), "message": error.get('Message')}
+                for error in errors
+            ]
+        }
     
-    def list_files(
+    async def list_files(
         self,
         bucket_name: str,
         prefix: str = "",
         max_keys: int = 1000
     ) -> List[Dict[str, Any]]:
         """Lista arquivos em um bucket."""
-        try:
-            response = self.s3_client.list_objects_v2(
-                Bucket=bucket_name,
-                Prefix=prefix,
-                MaxKeys=max_keys
-            )
-            
-            files = []
-            for obj in response.get('Contents', []):
-                files.append({
-                    "object_name": obj['Key'],
-                    "file_size": obj['Size'],
-                    "last_modified": obj['LastModified'].isoformat(),
-                    "etag": obj['ETag'].strip('"')
-                })
-            
-            logger.debug(f"Listados {len(files)} arquivos no bucket '{bucket_name}' com prefixo '{prefix}'")
-            
-            return files
-            
-        except ClientError as e:
-            logger.error(f"Erro ao listar arquivos no bucket '{bucket_name}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao listar arquivos: {str(e)}"
-            )
+        response = await self._run(
+            self.s3_client.list_objects_v2,
+            Bucket=bucket_name,
+            Prefix=prefix,
+            MaxKeys=max_keys
+        )
+        
+        files = []
+        for obj in response.get('Contents', []):
+            files.append({
+                "object_name": obj['Key'],
+                "file_size": obj['Size'],
+                "last_modified": obj['LastModified'],
+                "etag": obj['ETag'][1:-1]
+            })
+        
+        logger.debug(f"Listados {len(files)} arquivos no bucket '{bucket_name}' com prefixo '{prefix}'")
+        
+        return files
+    
+    def iter_files(
+        self,
+        bucket_name: str,
+        prefix: str = ""
+    ) -> Iterator[Tuple[str, int, datetime, str]]:
+        """Percorre os objetos de um bucket página a página (bloqueante).
+        
+        Gera tuplas (chave, tamanho, última modificação, ETag) sem montar a
+        lista completa em memória; executar fora do event loop.
+        """
+        paginator = self.s3_client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=prefix):
+            for obj in page.get('Contents', ()):
+                yield obj['Key'], obj['Size'], obj['LastModified'], obj['ETag']
     
-    def copy_file(
+    async def copy_file(
         self,
         source_bucket: str,
         source_object: str,
         dest_bucket: str,
-        dest_object: str
+        dest_object: str,
+        small: bool = False
     ) -> bool:
-        """Copia um arquivo entre buckets ou dentro do mesmo bucket."""
-        try:
-            copy_source = {'Bucket': source_bucket, 'Key': source_object}
-            
-            self.s3_client.copy_object(
+        """Copia um arquivo entre buckets ou dentro do mesmo bucket.
+        
+        Use small=True para objetos sabidamente pequenos (copy_object direto,
+        sem o HEAD feito pelo gerenciador de transferências).
+        """
+        copy_source = {'Bucket': source_bucket, 'Key': source_object}
+        
+        if small:
+            await self._run(
+                self.s3_client.copy_object,
                 CopySource=copy_source,
                 Bucket=dest_bucket,
                 Key=dest_object
             )
-            
-            logger.info(f"Arquivo copiado de '{source_bucket}/{source_object}' para '{dest_bucket}/{dest_object}'")
-            
-            return True
-            
-        except ClientError as e:
-            logger.error(f"Erro ao copiar arquivo: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao copiar arquivo: {str(e)}"
+        else:
+            # Cópia gerenciada: multipart no servidor para objetos grandes
+            # (copy_object é limitado a 5 GB)
+            await self._run(
+                lambda: self._transfer.copy(copy_source, dest_bucket, dest_object).result()
             )
+        
+        self._head_cache.pop((dest_bucket, dest_object), None)
+        
+        logger.info(f"Arquivo copiado de '{source_bucket}/{source_object}' para '{dest_bucket}/{dest_object}'")
+        
+        return True
     
-    def get_bucket_stats(self, bucket_name: str) -> Dict[str, Any]:
+    async def get_bucket_stats(self, bucket_name: str) -> Dict[str, Any]:
         """Obtém estatísticas de um bucket."""
-        try:
-            # Listar todos os objetos para calcular estatísticas
-            paginator = self.s3_client.get_paginator('list_objects_v2')
-            page_iterator = paginator.paginate(Bucket=bucket_name)
-            
-            total_objects = 0
+        cached_stats = self._stats_cache.get(bucket_name)
+        if cached_stats is not None:
+            return cached_stats
+        
+        def _collect_stats():
             total_size = 0
-            file_types = {}
+            file_types = Counter()
             
-            for page in page_iterator:
-                for obj in page.get('Contents', []):
-                    total_objects += 1
-                    total_size += obj['Size']
-                    
-                    # Contar tipos de arquivo
-                    _, ext = os.path.splitext(obj['Key'])
-                    ext = ext.lower() if ext else 'sem_extensao'
-                    file_types[ext] = file_types.get(ext, 0) + 1
-            
-            return {
-                "bucket_name": bucket_name,
-                "total_objects": total_objects,
-                "total_size_bytes": total_size,
-                "total_size_mb": round(total_size / (1024 * 1024), 2),
-                "file_types": file_types
-            }
+            # Percorrer todos os objetos sem materializar a listagem
+            for key, size, _, _ in self.iter_files(bucket_name):
+                total_size += size
+                file_types[os.path.splitext(key)[1].lower() or 'sem_extensao'] += 1
             
-        except ClientError as e:
-            logger.error(f"Erro ao obter estatísticas do bucket '{bucket_name}': {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Erro ao obter estatísticas: {str(e)}"
-            )
+            return sum(file_types.values()), total_size, dict(file_types)
+        
+        # A paginação faz uma requisição por página; executar tudo em thread
+        total_objects, total_size, file_types = await self._run(_collect_stats)
+        
+        stats = {
+            "bucket_name": bucket_name,
+            "total_objects": total_objects,
+            "total_size_bytes": total_size,
+            "total_size_mb": round(total_size / (1024 * 1024), 2),
+            "file_types": file_types
+        }
+        self._stats_cache[bucket_name] = stats
+        
+        return stats
 
 
-# Instância global do serviço MinIO
-minio_service = MinIOService()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_minio_service() -> MinIOService:
+    """Retorna a instância do serviço MinIO, criada no primeiro uso.
+    
+    Construir o cliente boto3 carrega os modelos de serviço do botocore;
+    adiar isso tira esse custo do import da aplicação.
+    """
+    return MinIOService()
\ No newline at end of file
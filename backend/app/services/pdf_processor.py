@@ -1,19 +1,102 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Set, AsyncIterator
 from fastapi import HTTPException, status, UploadFile, BackgroundTasks
+from sqlalchemy import JSON, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
+from pydantic import TypeAdapter, ValidationError
+from app.core.config import settings
 from app.core.logging import logger
-from app.services.minio_service import minio_service
+from app.services.minio_service import get_minio_service, MinIOError
 from app.services.langflow_service import langflow_service
 from app.services.livro_service import LivroService
 from app.services.ato_service import AtoService
 from app.services.ai_usage_service import AiUsageService
-from app.models.livro import Livro
+from app.models.livro import Livro, StatusLivro
 from app.models.ato import Ato
+from app.db.base import LIVRO_HAS_PDF_SHA256
 from app.schemas.livro import LivroUpdate
 from app.schemas.ato import AtoCreate
-from datetime import datetime
+from datetime import date, datetime
+from functools import lru_cache
 import asyncio
 import json
+import time
+import orjson
+
+
+# Atos inseridos por savepoint ao gravar o resultado do LangFlow
+_ATO_BATCH_SIZE = 50
+# Acima deste número de atos o PostgreSQL recebe os registros via COPY
+_ATO_COPY_THRESHOLD = 200
+
+# Validador compilado uma vez para a lista completa de atos
+_ATOS_ADAPTER = TypeAdapter(List[AtoCreate])
+
+# Limita os PDFs enviados ao LangFlow ao mesmo tempo neste processo
+_LANGFLOW_SEM = asyncio.Semaphore(settings.LANGFLOW_CONCURRENCY)
+
+# Relacionamentos do livro carregados junto com ele no processamento
+# (ex.: selectinload(Livro.cartorio)), para o contexto não disparar lazy loads
+_PROCESSING_LOAD_OPTIONS: tuple = ()
+
+# Processamentos em andamento neste processo, por livro
+_inflight: Dict[int, asyncio.Task] = {}
+
+# Filas dos clientes acompanhando o status de cada livro (SSE)
+_status_subscribers: Dict[int, Set[asyncio.Queue]] = {}
+_TERMINAL_STATUSES = frozenset({"concluido", "erro"})
+# Intervalo dos comentários keep-alive enviados enquanto não há eventos
+_STATUS_KEEPALIVE_SECONDS = 15
+
+
+def _parse_date(value: Any) -> Optional[date]:
+    """Converte uma data extraída pela IA (ISO 8601) ou retorna None."""
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _build_metadados_arquivo(upload_result: Dict[str, Any]) -> Dict[str, Any]:
+    """Monta os metadados do arquivo enviado, com chaves em ordem estável."""
+    return {
+        "bucket": upload_result["bucket_name"],
+        "data_upload": upload_result["upload_timestamp"],
+        "nome_original": upload_result["original_filename"],
+        "tamanho_bytes": upload_result["file_size"],
+        "tipo_conteudo": upload_result["content_type"],
+    }
+
+
+def _metadados_arquivo(livro: Livro) -> Dict[str, Any]:
+    """Retorna os metadados do arquivo do livro já decodificados.
+    
+    Registros antigos podem trazer o JSON como texto; nesse caso ele é
+    decodificado a cada chamada.
+    """
+    metadados = livro.metadados_arquivo
+    if isinstance(metadados, dict):
+        return metadados
+    if not metadados:
+        return {}
+    return orjson.loads(metadados)
+
+
+@lru_cache(maxsize=32)
+def _build_context(livro_tipo: str, numero: int, ano: int) -> Dict[str, Any]:
+    """Monta o contexto enviado ao LangFlow (compartilhado; não modificar)."""
+    return {
+        "livro_numero": numero,
+        "livro_ano": ano,
+        "livro_tipo": livro_tipo,
+        "cartorio_info": {
+            "nome": "Cartório ActNexus",  # Pode ser configurável
+            "cidade": "São Paulo",
+            "estado": "SP"
+        }
+    }
 
 
 class PDFProcessorService:
@@ -56,68 +139,263 @@ class PDFProcessorService:
             # Fazer upload do arquivo para MinIO
             logger.info(f"Iniciando upload de PDF para livro {livro_id}")
             
-            upload_result = await minio_service.upload_file(
-                file=file,
+            # Repassar o arquivo temporário do upload, enviado em partes; o
+            # SHA-256 é calculado durante o envio, sem reler o arquivo
+            upload_result = await get_minio_service().upload_fileobj(
+                fileobj=file.file,
+                filename=file.filename,
+                content_type="application/pdf",
                 prefix=f"livros/{livro_id}"
             )
+            pdf_sha256 = upload_result["sha256"]
             
-            # Atualizar livro com informações do PDF
-            livro_update = LivroUpdate(
-                url_pdf_original=upload_result["object_name"],
-                status="processando",
-                metadados_arquivo={
-                    "nome_original": upload_result["original_filename"],
-                    "tamanho_bytes": upload_result["file_size"],
-                    "tipo_conteudo": upload_result["content_type"],
-                    "data_upload": upload_result["upload_timestamp"],
-                    "bucket": upload_result["bucket_name"]
-                }
-            )
+            # PDF idêntico já vinculado a outro livro: descartar o objeto
+            # enviado e recusar antes de uma nova execução do LangFlow
+            duplicado = await self._find_duplicate(db, pdf_sha256, livro_id)
+            if duplicado:
+                try:
+                    await get_minio_service().delete_file(
+                        upload_result["bucket_name"], upload_result["object_name"]
+                    )
+                except MinIOError as delete_error:
+                    logger.warning(f"Erro ao descartar PDF duplicado {upload_result['object_name']}: {str(delete_error)}")
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail=duplicado
+                )
             
-            updated_livro = await self.livro_service.update(db, livro_id, livro_update)
+            return await self._register_uploaded_pdf(
+                db, livro_id, upload_result, background_tasks, process_immediately,
+                pdf_sha256=pdf_sha256
+            )
             
-            logger.info(f"PDF enviado com sucesso para livro {livro_id}: {upload_result['object_name']}")
+        except (HTTPException, MinIOError):
+            raise
+        except Exception as e:
+            logger.error(f"Erro no upload de PDF para livro {livro_id}: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Erro no upload do PDF: {str(e)}"
+            )
+    
+    async def _register_uploaded_pdf(
+        self,
+        db: AsyncSession,
+        livro_id: int,
+        upload_result: Dict[str, Any],
+        background_tasks: BackgroundTasks,
+        process_immediately: bool,
+        pdf_sha256: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Vincula o PDF enviado ao livro e agenda o processamento."""
+        # Colunas do PDF não fazem parte do LivroUpdate: gravadas diretamente
+        valores = {
+            "url_pdf_original": upload_result["object_name"],
+            "metadados_arquivo": _build_metadados_arquivo(upload_result),
+            "status": StatusLivro("pendente"),
+        }
+        if pdf_sha256 and LIVRO_HAS_PDF_SHA256:
+            valores["pdf_sha256"] = pdf_sha256
+        await db.execute(
+            update(Livro)
+            .where(Livro.id == livro_id)
+            .values(**valores)
+        )
+        await db.commit()
+        self._publish_status(livro_id, "pendente")
+        
+        logger.info(f"PDF enviado com sucesso para livro {livro_id}: {upload_result['object_name']}")
+        
+        # Iniciar processamento em background se solicitado
+        if process_immediately:
+            background_tasks.add_task(
+                self.process_pdf_background,
+                livro_id,
+                upload_result["bucket_name"],
+                upload_result["object_name"]
+            )
+            logger.info(f"Processamento em background iniciado para livro {livro_id}")
+        
+        return {
+            "livro_id": livro_id,
+            "upload_info": upload_result,
+            "status": "uploaded",
+            "processing_started": process_immediately,
+            "message": "PDF enviado com sucesso" + (" e processamento iniciado" if process_immediately else "")
+        }
+    
+    async def _find_duplicate(
+        self,
+        db: AsyncSession,
+        pdf_sha256: str,
+        livro_id: int
+    ) -> Optional[Dict[str, Any]]:
+        """Procura outro livro com o mesmo PDF (pelo SHA-256) e resume seus atos.
+        
+        O próprio livro e livros cujo processamento falhou não contam, para
+        que o mesmo PDF possa ser enviado de novo.
+        """
+        if not LIVRO_HAS_PDF_SHA256:
+            return None
+        result = await db.execute(
+            select(Livro.id, Livro.status)
+            .where(
+                Livro.pdf_sha256 == pdf_sha256,
+                Livro.id != livro_id,
+                Livro.status != StatusLivro("erro")
+            )
+            .limit(1)
+        )
+        existente = result.first()
+        if not existente:
+            return None
+        
+        total_atos = await db.scalar(
+            select(func.count(Ato.id)).where(Ato.livro_id == existente.id)
+        )
+        
+        logger.info(f"PDF duplicado (sha256 {pdf_sha256[:12]}…) já pertence ao livro {existente.id}")
+        
+        return {
+            "livro_id": existente.id,
+            "livro_status": existente.status,
+            "total_atos": total_atos or 0,
+            "message": f"PDF idêntico já enviado para o livro {existente.id}"
+        }
+    
+    async def initiate_pdf_upload(
+        self,
+        livro_id: int,
+        filename: str,
+        db: AsyncSession
+    ) -> Dict[str, Any]:
+        """Gera URL pré-assinada para o cliente enviar o PDF direto ao MinIO."""
+        if not filename.lower().endswith('.pdf'):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Apenas arquivos PDF são aceitos"
+            )
+        
+        livro = await self.livro_service.get_by_id(db, livro_id)
+        if not livro:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Livro não encontrado"
+            )
+        
+        return await get_minio_service().initiate_upload(
+            filename=filename,
+            prefix=f"livros/{livro_id}",
+            content_type="application/pdf"
+        )
+    
+    async def complete_pdf_upload(
+        self,
+        livro_id: int,
+        object_name: str,
+        filename: str,
+        db: AsyncSession,
+        background_tasks: BackgroundTasks,
+        process_immediately: bool = True
+    ) -> Dict[str, Any]:
+        """Finaliza um upload direto ao MinIO e inicia o processamento."""
+        try:
+            # Impedir que um livro seja vinculado a objetos de outro livro
+            if not object_name.startswith(f"livros/{livro_id}/"):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Objeto não pertence a este livro"
+                )
             
-            # Iniciar processamento em background se solicitado
-            if process_immediately:
-                background_tasks.add_task(
-                    self.process_pdf_background,
-                    livro_id,
-                    upload_result["bucket_name"],
-                    upload_result["object_name"]
+            livro = await self.livro_service.get_by_id(db, livro_id)
+            if not livro:
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail="Livro não encontrado"
                 )
-                logger.info(f"Processamento em background iniciado para livro {livro_id}")
             
-            return {
-                "livro_id": livro_id,
-                "upload_info": upload_result,
-                "status": "uploaded",
-                "processing_started": process_immediately,
-                "message": "PDF enviado com sucesso" + (" e processamento iniciado" if process_immediately else "")
-            }
+            upload_result = await get_minio_service().finalize_upload(
+                bucket_name=get_minio_service().default_bucket,
+                object_name=object_name,
+                original_filename=filename
+            )
             
-        except HTTPException:
+            return await self._register_uploaded_pdf(
+                db, livro_id, upload_result, background_tasks, process_immediately
+            )
+            
+        except (HTTPException, MinIOError):
             raise
         except Exception as e:
-            logger.error(f"Erro no upload de PDF para livro {livro_id}: {str(e)}")
+            logger.error(f"Erro ao finalizar upload de PDF para livro {livro_id}: {str(e)}")
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Erro no upload do PDF: {str(e)}"
             )
     
+    def is_processing(self, livro_id: int) -> bool:
+        """Indica se há um processamento do livro em andamento neste processo."""
+        task = _inflight.get(livro_id)
+        return task is not None and not task.done()
+    
     async def process_pdf_background(
         self,
         livro_id: int,
         bucket_name: str,
-        object_name: str
+        object_name: str,
+        refresh_url: bool = False
     ) -> None:
-        """Processa um PDF em background usando LangFlow."""
+        """Processa um PDF em background, ignorando livros já em processamento."""
+        if self.is_processing(livro_id):
+            logger.warning(f"Livro {livro_id} já está em processamento; tarefa duplicada ignorada")
+            return
+        
+        _inflight[livro_id] = asyncio.current_task()
+        try:
+            await self._process_pdf(livro_id, bucket_name, object_name, refresh_url)
+        finally:
+            _inflight.pop(livro_id, None)
+    
+    async def _process_pdf(
+        self,
+        livro_id: int,
+        bucket_name: str,
+        object_name: str,
+        refresh_url: bool
+    ) -> None:
+        """Processa um PDF usando LangFlow."""
         from app.db.session import get_db_session
         
         async with get_db_session() as db:
+            claimed = None
             try:
                 logger.info(f"Iniciando processamento em background - Livro {livro_id}")
                 
+                # Reservar o livro atomicamente: só um worker consegue passar o
+                # status para "processando" (um lock de linha seria liberado
+                # no primeiro commit e não impediria execuções paralelas)
+                claimed = await db.scalar(
+                    update(Livro)
+                    .where(
+                        Livro.id == livro_id,
+                        Livro.status != StatusLivro("processando")
+                    )
+                    .values(status=StatusLivro("processando"))
+                    .returning(Livro.id)
+                )
+                await db.commit()
+                if claimed is None:
+                    logger.warning(
+                        f"Livro {livro_id} inexistente ou já em processamento; processamento ignorado"
+                    )
+                    return
+                self._publish_status(livro_id, "processando")
+                
+                # Carregar o livro uma única vez, com os relacionamentos do contexto
+                livro = await self.livro_service.get_livro_by_id_with_relations(
+                    db, livro_id, *_PROCESSING_LOAD_OPTIONS
+                )
+                
                 # Registrar início do processamento de IA
                 ai_log_data = {
                     "operacao": "process_pdf",
@@ -131,45 +409,47 @@ class PDFProcessorService:
                     "status": "iniciado"
                 }
                 
-                ai_log = await self.ai_usage_service.create_log(db, ai_log_data)
-                
-                # Gerar URL pré-assinada para o PDF
-                pdf_url = minio_service.create_presigned_url(
-                    bucket_name=bucket_name,
-                    object_name=object_name,
-                    expiration=3600  # 1 hora
+                # Gerar a URL pré-assinada do PDF enquanto o log é gravado. O log
+                # é aguardado até o fim antes de qualquer erro chegar aos handlers
+                # abaixo, que voltam a usar a mesma sessão do banco.
+                pdf_url_task = asyncio.create_task(
+                    get_minio_service().get_cached_presigned_url(
+                        bucket_name=bucket_name,
+                        object_name=object_name,
+                        expiration=3600,  # 1 hora
+                        refresh=refresh_url
+                    )
                 )
+                try:
+                    ai_log = await self.ai_usage_service.create_log(db, ai_log_data)
+                except BaseException:
+                    pdf_url_task.cancel()
+                    raise
+                pdf_url = await pdf_url_task
                 
                 logger.debug(f"URL pré-assinada gerada para livro {livro_id}")
                 
                 # Obter contexto adicional do livro
-                livro = await self.livro_service.get_by_id(db, livro_id)
-                additional_context = {
-                    "livro_numero": livro.numero,
-                    "livro_ano": livro.ano,
-                    "livro_tipo": livro.tipo,
-                    "cartorio_info": {
-                        "nome": "Cartório ActNexus",  # Pode ser configurável
-                        "cidade": "São Paulo",
-                        "estado": "SP"
-                    }
-                }
+                additional_context = _build_context(livro.tipo, livro.numero, livro.ano)
                 
                 # Processar PDF com LangFlow
-                start_time = datetime.now()
+                start_ns = time.perf_counter_ns()
                 
                 try:
-                    langflow_result = await langflow_service.process_pdf(
-                        pdf_url=pdf_url,
-                        livro_id=livro_id,
-                        additional_context=additional_context
-                    )
+                    async with _LANGFLOW_SEM:
+                        langflow_result = await langflow_service.process_pdf(
+                            pdf_url=pdf_url,
+                            livro_id=livro_id,
+                            additional_context=additional_context
+                        )
                     
-                    end_time = datetime.now()
-                    processing_time = (end_time - start_time).total_seconds()
+                    processing_time = (time.perf_counter_ns() - start_ns) / 1e9
                     
                     logger.info(f"LangFlow processou PDF com sucesso - Livro {livro_id}")
                     
+                    # Resposta serializada uma vez (em C) para estimar tokens
+                    resposta_json = orjson.dumps(langflow_result, default=str)
+                    
                     # Atualizar log de IA com sucesso
                     await self.ai_usage_service.update_log(
                         db,
@@ -179,21 +459,25 @@ class PDFProcessorService:
                             "dados_resposta": langflow_result,
                             "tempo_resposta_ms": int(processing_time * 1000),
                             "tokens_entrada": len(pdf_url) // 4,  # Estimativa
-                            "tokens_saida": len(str(langflow_result)) // 4,  # Estimativa
+                            "tokens_saida": len(resposta_json) // 4,  # Estimativa
                             "custo_estimado": processing_time * 0.01  # Estimativa
                         }
                     )
                     
                     # Processar resultado e atualizar banco de dados
-                    await self._process_langflow_result(
-                        db, livro_id, langflow_result
+                    atos_criados = await self._process_langflow_result(
+                        db, livro, langflow_result
                     )
+                    self._publish_status(livro_id, "concluido", total_atos=atos_criados)
                     
                     logger.info(f"Processamento concluído com sucesso - Livro {livro_id}")
                     
                 except Exception as langflow_error:
                     logger.error(f"Erro no processamento LangFlow - Livro {livro_id}: {str(langflow_error)}")
                     
+                    # Descartar a transação que falhou antes de voltar a usar a sessão
+                    await db.rollback()
+                    
                     # Atualizar log de IA com erro
                     await self.ai_usage_service.update_log(
                         db,
@@ -201,7 +485,7 @@ class PDFProcessorService:
                         {
                             "status": "erro",
                             "mensagem_erro": str(langflow_error),
-                            "tempo_resposta_ms": int((datetime.now() - start_time).total_seconds() * 1000)
+                            "tempo_resposta_ms": (time.perf_counter_ns() - start_ns) // 1_000_000
                         }
                     )
                     
@@ -218,8 +502,12 @@ class PDFProcessorService:
             except Exception as e:
                 logger.error(f"Erro no processamento em background - Livro {livro_id}: {str(e)}")
                 
-                # Tentar atualizar status do livro para erro
+                # Tentar atualizar status do livro para erro; a reserva já foi
+                # gravada e precisa ser liberada mesmo após uma falha no banco
                 try:
+                    await db.rollback()
+                    if claimed is not None:
+                        await self._set_livro_status(db, livro_id, "erro")
                     await self.livro_service.update_processing_status(
                         db,
                         livro_id,
@@ -228,14 +516,29 @@ class PDFProcessorService:
                     )
                 except Exception as update_error:
                     logger.error(f"Erro ao atualizar status do livro {livro_id}: {str(update_error)}")
+                
+                self._publish_status(livro_id, "erro", mensagem=str(e))
+    
+    async def _set_livro_status(self, db: AsyncSession, livro_id: int, novo_status: str) -> None:
+        """Grava o status do livro diretamente (libera a reserva de "processando")."""
+        await db.execute(
+            update(Livro)
+            .where(Livro.id == livro_id)
+            .values(status=StatusLivro(novo_status))
+        )
+        await db.commit()
     
     async def _process_langflow_result(
         self,
         db: AsyncSession,
-        livro_id: int,
+        livro: Livro,
         langflow_result: Dict[str, Any]
-    ) -> None:
-        """Processa o resultado do LangFlow e atualiza o banco de dados."""
+    ) -> int:
+        """Processa o resultado do LangFlow e atualiza o banco de dados.
+        
+        Retorna quantos atos foram criados.
+        """
+        livro_id = livro.id
         try:
             # Extrair metadados do livro
             livro_metadata = langflow_result.get("livro_metadata", {})
@@ -244,7 +547,7 @@ class PDFProcessorService:
             
             # Atualizar metadados do livro
             livro_update_data = {
-                "status": "concluido",
+                "status": StatusLivro("concluido"),
                 "metadados_processamento": {
                     "data_processamento": datetime.now().isoformat(),
                     "total_atos_extraidos": len(atos_data),
@@ -256,56 +559,164 @@ class PDFProcessorService:
             
             # Adicionar metadados extraídos se disponíveis
             if livro_metadata:
-                if "numero" in livro_metadata:
-                    livro_update_data["numero"] = livro_metadata["numero"]
-                if "ano" in livro_metadata:
-                    livro_update_data["ano"] = livro_metadata["ano"]
-                if "tipo" in livro_metadata:
-                    livro_update_data["tipo"] = livro_metadata["tipo"]
-                if "data_abertura" in livro_metadata:
-                    livro_update_data["data_abertura"] = livro_metadata["data_abertura"]
-                if "data_encerramento" in livro_metadata:
-                    livro_update_data["data_encerramento"] = livro_metadata["data_encerramento"]
-            
-            # Atualizar livro
-            livro_update = LivroUpdate(**livro_update_data)
-            await self.livro_service.update(db, livro_id, livro_update)
-            
-            logger.info(f"Metadados do livro {livro_id} atualizados")
-            
-            # Criar atos extraídos
-            atos_criados = []
-            for ato_data in atos_data:
-                try:
-                    ato_create = AtoCreate(
-                        livro_id=livro_id,
-                        numero=ato_data.get("numero"),
-                        tipo=ato_data.get("tipo", "Não especificado"),
-                        data_ato=ato_data.get("data_ato"),
-                        conteudo_original=ato_data.get("conteudo_original", ""),
-                        conteudo_markdown=ato_data.get("conteudo_markdown", ""),
-                        partes=ato_data.get("partes", []),
-                        observacoes=ato_data.get("observacoes", ""),
-                        status_ia=ato_data.get("status_ia", "processado"),
-                        confianca_ia=ato_data.get("confianca_ia", 0.0)
-                    )
-                    
-                    ato_criado = await self.ato_service.create(db, ato_create)
-                    atos_criados.append(ato_criado)
-                    
-                    logger.debug(f"Ato {ato_data.get('numero')} criado para livro {livro_id}")
-                    
-                except Exception as ato_error:
-                    logger.error(f"Erro ao criar ato {ato_data.get('numero')} do livro {livro_id}: {str(ato_error)}")
-                    # Continuar com os outros atos mesmo se um falhar
-                    continue
+                # Validados com as regras do LivroUpdate; valores inválidos
+                # são ignorados em vez de abortar a gravação dos atos
+                for campo in ("numero", "ano", "tipo"):
+                    if campo not in livro_metadata:
+                        continue
+                    try:
+                        valor = getattr(
+                            LivroUpdate.model_validate({campo: livro_metadata[campo]}), campo
+                        )
+                    except ValidationError as campo_error:
+                        logger.warning(f"Campo {campo} extraído do livro {livro_id} ignorado: {str(campo_error)}")
+                        continue
+                    if valor is not None:
+                        livro_update_data[campo] = valor
+                for campo_data in ("data_abertura", "data_encerramento"):
+                    valor_data = _parse_date(livro_metadata.get(campo_data))
+                    if valor_data:
+                        livro_update_data[campo_data] = valor_data
             
-            logger.info(f"Processamento concluído - Livro {livro_id}: {len(atos_criados)} atos criados")
+            # Validar atos extraídos (inválidos são descartados)
+            registros = [
+                {
+                    "livro_id": livro_id,
+                    "numero_ato": str(ato_data.get("numero") or ""),
+                    "tipo_ato": ato_data.get("tipo", "Não especificado"),
+                    "data_ato": ato_data.get("data_ato"),
+                    "conteudo_original": ato_data.get("conteudo_original", ""),
+                    "conteudo_markdown": ato_data.get("conteudo_markdown", ""),
+                    "partes": ato_data.get("partes", []),
+                    "observacoes": ato_data.get("observacoes", "")
+                }
+                for ato_data in atos_data
+            ]
+            
+            try:
+                # Caso comum: lista inteira válida, validada em uma única passada
+                atos_validos = _ATOS_ADAPTER.validate_python(registros)
+            except ValidationError:
+                atos_validos = []
+                for registro in registros:
+                    try:
+                        atos_validos.append(AtoCreate.model_validate(registro))
+                    except ValidationError as ato_error:
+                        logger.error(f"Ato {registro['numero_ato']} do livro {livro_id} inválido: {str(ato_error)}")
+                        # Continuar com os outros atos mesmo se um falhar
+            
+            novos_atos = [ato.model_dump(exclude_none=True) for ato in atos_validos]
+            
+            # Gravar livro e atos em uma única transação: se algo falhar, o
+            # savepoint desfaz tudo e o livro não fica "concluido" pela metade
+            async with db.begin_nested():
+                # Atualizar o livro já carregado
+                for campo, valor in livro_update_data.items():
+                    setattr(livro, campo, valor)
+                
+                # Criar atos extraídos em lote
+                atos_criados = await self._insert_atos(db, livro_id, novos_atos)
+            
+            await db.commit()
+            
+            logger.info(f"Processamento concluído - Livro {livro_id}: {atos_criados} atos criados")
+            
+            return atos_criados
             
         except Exception as e:
             logger.error(f"Erro ao processar resultado do LangFlow para livro {livro_id}: {str(e)}")
             raise
     
+    async def _insert_atos(
+        self,
+        db: AsyncSession,
+        livro_id: int,
+        atos_values: List[Dict[str, Any]]
+    ) -> int:
+        """Insere atos em lotes de _ATO_BATCH_SIZE, cada lote em um savepoint.
+        
+        Cada lote é um único INSERT em massa (sem unit of work do ORM). Se um
+        lote violar alguma restrição, seus atos são inseridos um a um
+        para descartar apenas os inválidos. Livros grandes no PostgreSQL
+        tentam antes um único COPY. Retorna quantos foram criados.
+        """
+        if len(atos_values) > _ATO_COPY_THRESHOLD and db.bind.dialect.name == "postgresql":
+            try:
+                async with db.begin_nested():
+                    return await self._copy_atos(db, atos_values)
+            except Exception as copy_error:
+                logger.warning(
+                    f"COPY de atos do livro {livro_id} falhou, usando inserção em lotes: {str(copy_error)}"
+                )
+        
+        atos_criados = 0
+        
+        for start in range(0, len(atos_values), _ATO_BATCH_SIZE):
+            lote = atos_values[start:start + _ATO_BATCH_SIZE]
+            
+            try:
+                async with db.begin_nested():
+                    await db.execute(insert(Ato), lote)
+                atos_criados += len(lote)
+                continue
+            except IntegrityError as batch_error:
+                logger.warning(
+                    f"Lote de atos do livro {livro_id} rejeitado, inserindo individualmente: {str(batch_error)}"
+                )
+            
+            for values in lote:
+                try:
+                    async with db.begin_nested():
+                        await db.execute(insert(Ato), [values])
+                    atos_criados += 1
+                except IntegrityError as ato_error:
+                    logger.error(f"Erro ao criar ato {values.get('numero_ato')} do livro {livro_id}: {str(ato_error)}")
+        
+        return atos_criados
+    
+    async def _copy_atos(
+        self,
+        db: AsyncSession,
+        atos_values: List[Dict[str, Any]]
+    ) -> int:
+        """Grava os atos com COPY pela conexão asyncpg da sessão."""
+        table = Ato.__table__
+        columns = [column for column in table.columns if column.name != "id"]
+        
+        # COPY não aplica defaults do lado Python; calcular os que faltarem
+        defaults = {}
+        for column in columns:
+            default = column.default
+            if default is None or default.is_sequence or default.is_clause_element:
+                continue
+            defaults[column.name] = default.arg(None) if default.is_callable else default.arg
+        
+        json_columns = {column.name for column in columns if isinstance(column.type, JSON)}
+        column_names = [
+            column.name for column in columns
+            if column.name in defaults or any(column.name in values for values in atos_values)
+        ]
+        
+        records = []
+        for values in atos_values:
+            record = []
+            for name in column_names:
+                value = values.get(name, defaults.get(name))
+                if name in json_columns and value is not None:
+                    value = orjson.dumps(value).decode()
+                record.append(value)
+            records.append(tuple(record))
+        
+        connection = await db.connection()
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            table.name,
+            records=records,
+            columns=column_names
+        )
+        
+        return len(records)
+    
     async def reprocess_pdf(
         self,
         livro_id: int,
@@ -336,13 +747,24 @@ class PDFProcessorService:
                     detail="Livro já está sendo processado. Use force=true para forçar reprocessamento"
                 )
             
-            # Atualizar status para processando
+            # Tarefa ativa neste processo: nem force inicia uma segunda
+            if self.is_processing(livro_id):
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Livro já está sendo processado"
+                )
+            
+            # Colocar na fila; a tarefa passa para "processando" ao reservar
+            # o livro. Com force, isso também libera uma reserva presa de um
+            # processamento que terminou sem gravar o status final.
+            await self._set_livro_status(db, livro_id, "pendente")
             await self.livro_service.update_processing_status(
-                db, livro_id, "processando"
+                db, livro_id, "pendente"
             )
+            self._publish_status(livro_id, "pendente")
             
             # Extrair informações do bucket
-            bucket_name = livro.metadados_arquivo.get("bucket", "actnexus-livros")
+            bucket_name = _metadados_arquivo(livro).get("bucket", "actnexus-livros")
             object_name = livro.url_pdf_original
             
             # Iniciar reprocessamento em background
@@ -350,7 +772,8 @@ class PDFProcessorService:
                 self.process_pdf_background,
                 livro_id,
                 bucket_name,
-                object_name
+                object_name,
+                refresh_url=force
             )
             
             logger.info(f"Reprocessamento iniciado para livro {livro_id}")
@@ -370,6 +793,76 @@ class PDFProcessorService:
                 detail=f"Erro no reprocessamento: {str(e)}"
             )
     
+    def _publish_status(self, livro_id: int, status_livro: str, **detalhes: Any) -> None:
+        """Envia uma mudança de status aos clientes inscritos no livro."""
+        subscribers = _status_subscribers.get(livro_id)
+        if not subscribers:
+            return
+        
+        evento = {"livro_id": livro_id, "status": status_livro, **detalhes}
+        for queue in subscribers:
+            queue.put_nowait(evento)
+    
+    async def open_status_stream(
+        self,
+        livro_id: int,
+        db: AsyncSession
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Inscreve o cliente nas mudanças de status do livro.
+        
+        Retorna um iterador que entrega o status atual, depois cada mudança
+        até um status final; None indica que é hora de enviar keep-alive.
+        """
+        # Inscrever antes de ler o status para não perder eventos
+        queue: asyncio.Queue = asyncio.Queue()
+        _status_subscribers.setdefault(livro_id, set()).add(queue)
+        
+        try:
+            livro = await self.livro_service.get_by_id(db, livro_id)
+        except Exception:
+            self._unsubscribe_status(livro_id, queue)
+            raise
+        
+        if not livro:
+            self._unsubscribe_status(livro_id, queue)
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Livro não encontrado"
+            )
+        
+        return self._iter_status(livro_id, queue, {"livro_id": livro_id, "status": livro.status})
+    
+    async def _iter_status(
+        self,
+        livro_id: int,
+        queue: asyncio.Queue,
+        evento: Dict[str, Any]
+    ) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Entrega eventos da fila até um status final."""
+        try:
+            while True:
+                yield evento
+                if evento["status"] in _TERMINAL_STATUSES:
+                    return
+                
+                evento = None
+                while evento is None:
+                    try:
+                        evento = await asyncio.wait_for(queue.get(), _STATUS_KEEPALIVE_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield None
+        finally:
+            self._unsubscribe_status(livro_id, queue)
+    
+    def _unsubscribe_status(self, livro_id: int, queue: asyncio.Queue) -> None:
+        """Remove a fila do cliente do registro de inscritos."""
+        subscribers = _status_subscribers.get(livro_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del _status_subscribers[livro_id]
+    
     async def get_processing_status(
         self,
         livro_id: int,
@@ -397,7 +890,7 @@ class PDFProcessorService:
                 "status": livro.status,
                 "has_pdf": bool(livro.url_pdf_original),
                 "processing_metadata": livro.metadados_processamento or {},
-                "file_metadata": livro.metadados_arquivo or {},
+                "file_metadata": _metadados_arquivo(livro),
                 "atos_stats": atos_stats,
                 "ai_processing_logs": [
                     {
@@ -425,7 +918,8 @@ class PDFProcessorService:
         self,
         livro_id: int,
         db: AsyncSession,
-        generate_presigned: bool = True
+        generate_presigned: bool = True,
+        refresh: bool = False
     ) -> Dict[str, Any]:
         """Gera URL para download do PDF ou retorna o conteúdo."""
         try:
@@ -442,46 +936,45 @@ class PDFProcessorService:
                     detail="PDF não encontrado para este livro"
                 )
             
-            bucket_name = livro.metadados_arquivo.get("bucket", "actnexus-livros")
+            metadados = _metadados_arquivo(livro)
+            bucket_name = metadados.get("bucket", "actnexus-livros")
             object_name = livro.url_pdf_original
+            file_info = {
+                "original_filename": metadados.get("nome_original", "documento.pdf"),
+                "file_size": metadados.get("tamanho_bytes", 0),
+                "content_type": metadados.get("tipo_conteudo", "application/pdf")
+            }
             
             if generate_presigned:
                 # Gerar URL pré-assinada para download
-                download_url = minio_service.create_presigned_url(
+                download_url = await get_minio_service().get_cached_presigned_url(
                     bucket_name=bucket_name,
                     object_name=object_name,
                     expiration=3600,  # 1 hora
-                    method='GET'
+                    method='GET',
+                    refresh=refresh
                 )
                 
                 return {
                     "livro_id": livro_id,
                     "download_url": download_url,
                     "expires_in_seconds": 3600,
-                    "file_info": {
-                        "original_filename": livro.metadados_arquivo.get("nome_original", "documento.pdf"),
-                        "file_size": livro.metadados_arquivo.get("tamanho_bytes", 0),
-                        "content_type": livro.metadados_arquivo.get("tipo_conteudo", "application/pdf")
-                    }
+                    "file_info": file_info
                 }
             else:
-                # Baixar arquivo diretamente
-                file_content = minio_service.download_file(
+                # Abrir o arquivo para streaming, sem carregá-lo em memória
+                file_stream = await get_minio_service().iter_file(
                     bucket_name=bucket_name,
                     object_name=object_name
                 )
                 
                 return {
                     "livro_id": livro_id,
-                    "file_content": file_content,
-                    "file_info": {
-                        "original_filename": livro.metadados_arquivo.get("nome_original", "documento.pdf"),
-                        "file_size": len(file_content),
-                        "content_type": livro.metadados_arquivo.get("tipo_conteudo", "application/pdf")
-                    }
+                    "file_stream": file_stream,
+                    "file_info": file_info
                 }
                 
-        except HTTPException:
+        except (HTTPException, MinIOError):
             raise
         except Exception as e:
             logger.error(f"Erro no download do PDF do livro {livro_id}: {str(e)}")
@@ -1,422 +1,583 @@
 from typing import Optional, List
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, or_
+from sqlalchemy import select, update, and_, or_, func, bindparam
 from sqlalchemy.orm import selectinload
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import DBAPIError, IntegrityError
 from fastapi import HTTPException, status
 from app.models.user import User, UserRole
+from app.db.base import USER_SEARCH_COLUMNS
 from app.schemas.user import UserCreate, UserUpdate, UserPasswordUpdate
 from app.core.security import get_password_hash, verify_password
 from app.core.logging import logger
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, wraps
+import asyncio
+import inspect
+import os
 import uuid
 
 
-class UserService:
-    """Serviço para gerenciamento de usuários."""
-    
-    @staticmethod
-    async def create_user(
-        session: AsyncSession,
-        user_data: UserCreate,
-        created_by: Optional[User] = None
-    ) -> User:
-        """Cria um novo usuário."""
-        try:
-            # Verificar se email já existe
-            existing_user = await UserService.get_user_by_email(session, user_data.email)
-            if existing_user:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Email já está em uso"
-                )
-            
-            # Criar novo usuário
-            user = User(
-                id=uuid.uuid4(),
+# Relacionamentos usados nas verificações de permissão, carregados junto com
+# o usuário (ex.: selectinload(User.groups)); hoje o papel é a coluna role
+_USER_LOAD_OPTIONS: tuple = ()
+
+# Statements mais usados, construídos uma única vez na importação
+_USER_BASE = select(User).options(*_USER_LOAD_OPTIONS)
+_GET_BY_ID = _USER_BASE.where(User.id == bindparam("user_id"))
+_GET_BY_EMAIL = _USER_BASE.where(func.lower(User.email) == func.lower(bindparam("email")))
+# Página e total em uma só consulta (COUNT(*) OVER ())
+_LIST_BASE = _USER_BASE.add_columns(func.count().over().label("total")).order_by(User.name)
+_COUNT_BASE = select(func.count()).select_from(User)
+
+
+# Estatísticas do painel, recalculadas no máximo a cada 30 s; criação,
+# ativação e mudanças de papel invalidam
+_stats_cache: TTLCache = TTLCache(maxsize=1, ttl=30)
+
+# Threads para o bcrypt (CPU intensivo), fora do executor padrão do event loop
+_PASSWORD_POOL = ThreadPoolExecutor(
+    max_workers=os.cpu_count() or 1, thread_name_prefix="bcrypt"
+)
+
+
+async def _run_password(fn, *args):
+    """Executa hash/verificação de senha no pool dedicado."""
+    return await asyncio.get_running_loop().run_in_executor(_PASSWORD_POOL, fn, *args)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Hash fixo usado quando o email não existe (custo igual ao de um login real)."""
+    return get_password_hash("x" * 16)
+
+
+def _verify_dummy(password: str) -> bool:
+    """Verifica a senha contra o hash fixo; sempre falha."""
+    verify_password(password, _dummy_hash())
+    return False
+
+
+# Tentativas para falhas transitórias do banco e os SQLSTATEs que as
+# identificam: deadlock, falha de serialização e lock não obtido
+_TRANSIENT_RETRIES = 3
+_TRANSIENT_SQLSTATES = frozenset({"40P01", "40001", "55P03"})
+
+
+def _sqlstate(error: DBAPIError) -> Optional[str]:
+    """SQLSTATE do erro do driver (asyncpg expõe sqlstate; psycopg, pgcode)."""
+    orig = error.orig
+    for candidate in (orig, getattr(orig, "__cause__", None)):
+        code = getattr(candidate, "sqlstate", None) or getattr(candidate, "pgcode", None)
+        if code:
+            return code
+    return None
+
+
+def _integrity_detail(error: IntegrityError) -> str:
+    """Mensagem para uma violação de integridade, conforme a restrição."""
+    orig = error.orig
+    constraint = (
+        getattr(orig, "constraint_name", None)
+        or getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+        or str(orig)
+    )
+    if "email" in constraint.lower():
+        return "Email já está em uso"
+    return "Dados do usuário violam uma restrição do banco"
+
+
+class _Actor:
+    """Dados de quem executa a operação, lidos antes de qualquer rollback.
+    
+    Um rollback expira as instâncias da sessão; reler atributos de um User
+    expirado dispararia um lazy load fora do contexto assíncrono.
+    """
+    
+    __slots__ = ("id", "email", "_admin")
+    
+    def __init__(self, user: User):
+        self.id = user.id
+        self.email = user.email
+        self._admin = user.is_admin()
+    
+    def is_admin(self) -> bool:
+        return self._admin
+
+
+def _retry_transient(actor: Optional[str] = None):
+    """Repete a operação (com backoff) quando o banco acusa falha transitória.
+    
+    O usuário passado no parâmetro `actor` é trocado por um _Actor antes da
+    primeira tentativa, e o cache da requisição é limpo a cada nova tentativa.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+        
+        @wraps(fn)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            session = bound.arguments["session"]
+            cache = bound.arguments.get("cache")
+            if actor and bound.arguments.get(actor) is not None:
+                bound.arguments[actor] = _Actor(bound.arguments[actor])
+            
+            for attempt in range(_TRANSIENT_RETRIES):
+                try:
+                    return await fn(*bound.args, **bound.kwargs)
+                except DBAPIError as e:
+                    await session.rollback()
+                    if _sqlstate(e) not in _TRANSIENT_SQLSTATES or attempt == _TRANSIENT_RETRIES - 1:
+                        raise
+                    if cache:
+                        cache.clear()
+                    logger.warning("Falha transitória em {} (tentativa {}): {}", fn.__name__, attempt + 1, e)
+                    await asyncio.sleep(0.05 * 2 ** attempt)
+        return wrapper
+    return decorator
+
+
+def _cache_user(cache: Optional[dict], user: Optional[User]) -> None:
+    """Guarda o usuário no cache da requisição, por ID e por email."""
+    if cache is not None and user is not None:
+        cache[("id", user.id)] = user
+        cache[("email", user.email)] = user
+
+
+@_retry_transient(actor="created_by")
+async def create_user(
+    session: AsyncSession,
+    user_data: UserCreate,
+    created_by: Optional[User] = None
+) -> User:
+    """Cria um novo usuário."""
+    try:
+        hashed_password = await _run_password(get_password_hash, user_data.password)
+        
+        # Criar novo usuário em um único INSERT; a restrição única do
+        # email decide duplicidades (sem SELECT prévio nem corrida). No
+        # PostgreSQL o UUID é gerado pelo banco e volta no RETURNING
+        if session.bind.dialect.name == "postgresql":
+            insert, user_id = pg_insert, func.gen_random_uuid()
+        else:
+            insert, user_id = sqlite_insert, uuid.uuid4()
+        result = await session.execute(
+            insert(User)
+            .values(
+                id=user_id,
                 name=user_data.name,
                 email=user_data.email.lower(),
-                hashed_password=get_password_hash(user_data.password),
+                hashed_password=hashed_password,
                 role=user_data.role,
                 phone=user_data.phone,
                 department=user_data.department,
                 is_active=user_data.is_active,
                 is_verified=user_data.is_verified
             )
-            
-            session.add(user)
-            await session.commit()
-            await session.refresh(user)
-            
-            logger.info(
-                f"Usuário criado: {user.email} por {created_by.email if created_by else 'sistema'}"
-            )
-            
-            return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
+            .on_conflict_do_nothing(index_elements=[User.email])
+            .returning(User)
+        )
+        user = result.scalar_one_or_none()
+        if not user:
             await session.rollback()
-            logger.error(f"Erro ao criar usuário: {str(e)}")
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Email já está em uso"
             )
+        
+        await session.commit()
+        _stats_cache.clear()
+        
+        logger.info(
+            "Usuário criado: {} por {}", user.email, created_by.email if created_by else "sistema"
+        )
+        
+        return user
+        
+    except IntegrityError as e:
+        await session.rollback()
+        logger.warning("Violação de integridade ao criar usuário: {}", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_integrity_detail(e)
+        )
+
+
+async def get_user_by_id(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    cache: Optional[dict] = None
+) -> Optional[User]:
+    """Busca usuário por ID.
+    
+    Com cache (dict da requisição), repetições da mesma busca não vão ao banco.
+    """
+    if cache is not None and ("id", user_id) in cache:
+        return cache[("id", user_id)]
+    result = await session.execute(_GET_BY_ID, {"user_id": user_id})
+    user = result.scalar_one_or_none()
+    _cache_user(cache, user)
+    return user
+
+
+async def get_user_by_email(
+    session: AsyncSession,
+    email: str,
+    cache: Optional[dict] = None
+) -> Optional[User]:
+    """Busca usuário por email.
+    
+    Com cache (dict da requisição), repetições da mesma busca não vão ao banco.
+    """
+    if cache is not None and ("email", email.lower()) in cache:
+        return cache[("email", email.lower())]
+    result = await session.execute(_GET_BY_EMAIL, {"email": email})
+    user = result.scalar_one_or_none()
+    _cache_user(cache, user)
+    return user
+
+
+async def authenticate_user(
+    session: AsyncSession, 
+    email: str, 
+    password: str
+) -> Optional[User]:
+    """Autentica usuário com email e senha."""
+    user = await get_user_by_email(session, email)
+    if not user:
+        # Rodar um bcrypt mesmo assim: o tempo de resposta não revela
+        # se o email existe
+        await _run_password(_verify_dummy, password)
+        return None
+    
+    if not await _run_password(verify_password, password, user.hashed_password):
+        return None
     
-    @staticmethod
-    async def get_user_by_id(session: AsyncSession, user_id: uuid.UUID) -> Optional[User]:
-        """Busca usuário por ID."""
-        try:
-            result = await session.execute(
-                select(User).where(User.id == user_id)
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuário inativo"
+        )
+    
+    logger.info("Usuário autenticado: {}", user.email)
+    return user
+
+
+@_retry_transient(actor="updated_by")
+async def update_user(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    user_data: UserUpdate,
+    updated_by: User,
+    cache: Optional[dict] = None
+) -> User:
+    """Atualiza dados do usuário."""
+    try:
+        # Verificar permissões (só depende de quem atualiza)
+        if not updated_by.is_admin() and updated_by.id != user_id:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Sem permissão para atualizar este usuário"
             )
-            return result.scalar_one_or_none()
-        except Exception as e:
-            logger.error(f"Erro ao buscar usuário por ID {user_id}: {str(e)}")
-            return None
-    
-    @staticmethod
-    async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
-        """Busca usuário por email."""
-        try:
-            result = await session.execute(
-                select(User).where(User.email == email.lower())
+        
+        update_data = user_data.model_dump(exclude_unset=True)
+        
+        # Verificar se email já existe em outro usuário (se está sendo alterado)
+        if update_data.get('email'):
+            update_data['email'] = update_data['email'].lower()
+            email_em_uso = await session.scalar(
+                select(
+                    select(User.id)
+                    .where(
+                        func.lower(User.email) == update_data['email'],
+                        User.id != user_id
+                    )
+                    .exists()
+                )
             )
-            return result.scalar_one_or_none()
-        except Exception as e:
-            logger.error(f"Erro ao buscar usuário por email {email}: {str(e)}")
-            return None
-    
-    @staticmethod
-    async def authenticate_user(
-        session: AsyncSession, 
-        email: str, 
-        password: str
-    ) -> Optional[User]:
-        """Autentica usuário com email e senha."""
-        try:
-            user = await UserService.get_user_by_email(session, email)
-            if not user:
-                return None
-            
-            if not user.is_active:
+            if email_em_uso:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Usuário inativo"
+                    detail="Email já está em uso"
                 )
-            
-            if not verify_password(password, user.hashed_password):
-                return None
-            
-            logger.info(f"Usuário autenticado: {user.email}")
-            return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Erro na autenticação do usuário {email}: {str(e)}")
-            return None
-    
-    @staticmethod
-    async def update_user(
-        session: AsyncSession,
-        user_id: uuid.UUID,
-        user_data: UserUpdate,
-        updated_by: User
-    ) -> User:
-        """Atualiza dados do usuário."""
-        try:
-            user = await UserService.get_user_by_id(session, user_id)
+        
+        if not update_data:
+            user = await get_user_by_id(session, user_id, cache)
             if not user:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Usuário não encontrado"
                 )
-            
-            # Verificar permissões
-            if not updated_by.is_admin() and updated_by.id != user.id:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Sem permissão para atualizar este usuário"
-                )
-            
-            # Verificar se email já existe (se está sendo alterado)
-            if user_data.email and user_data.email.lower() != user.email:
-                existing_user = await UserService.get_user_by_email(session, user_data.email)
-                if existing_user:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="Email já está em uso"
-                    )
-            
-            # Atualizar campos
-            update_data = user_data.model_dump(exclude_unset=True)
-            if 'email' in update_data:
-                update_data['email'] = update_data['email'].lower()
-            
-            user.update_from_dict(update_data)
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            logger.info(
-                f"Usuário {user.email} atualizado por {updated_by.email}"
-            )
-            
             return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            await session.rollback()
-            logger.error(f"Erro ao atualizar usuário {user_id}: {str(e)}")
+        
+        # Atualizar apenas os campos enviados, em um único UPDATE ... RETURNING
+        result = await session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(**update_data)
+            .returning(User)
+        )
+        user = result.scalar_one_or_none()
+        if not user:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Usuário não encontrado"
             )
+        
+        # Entradas antigas do cache (ex.: email anterior) deixam de valer
+        if cache is not None:
+            for key in [key for key, cached in cache.items() if cached.id == user_id]:
+                del cache[key]
+        _cache_user(cache, user)
+        
+        await session.commit()
+        if "role" in update_data or "is_active" in update_data:
+            _stats_cache.clear()
+        
+        logger.info(
+            "Usuário {} atualizado por {}", user.email, updated_by.email
+        )
+        
+        return user
+        
+    except IntegrityError as e:
+        await session.rollback()
+        logger.warning("Violação de integridade ao atualizar usuário {}: {}", user_id, e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_integrity_detail(e)
+        )
+
+
+@_retry_transient(actor="updated_by")
+async def update_password(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    password_data: UserPasswordUpdate,
+    updated_by: User,
+    cache: Optional[dict] = None
+) -> User:
+    """Atualiza senha do usuário."""
+    # Papel de quem altera, avaliado uma única vez
+    is_admin = updated_by.is_admin()
     
-    @staticmethod
-    async def update_password(
-        session: AsyncSession,
-        user_id: uuid.UUID,
-        password_data: UserPasswordUpdate,
-        updated_by: User
-    ) -> User:
-        """Atualiza senha do usuário."""
-        try:
-            user = await UserService.get_user_by_id(session, user_id)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Usuário não encontrado"
-                )
-            
-            # Verificar permissões
-            if not updated_by.is_admin() and updated_by.id != user.id:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Sem permissão para alterar senha deste usuário"
-                )
-            
-            # Se não é admin, verificar senha atual
-            if not updated_by.is_admin() and not verify_password(
-                password_data.current_password, user.hashed_password
-            ):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Senha atual incorreta"
-                )
-            
-            # Atualizar senha
-            user.hashed_password = get_password_hash(password_data.new_password)
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            logger.info(
-                f"Senha do usuário {user.email} alterada por {updated_by.email}"
-            )
-            
-            return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            await session.rollback()
-            logger.error(f"Erro ao alterar senha do usuário {user_id}: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
-            )
+    # Verificar permissões (só depende de quem altera)
+    if not is_admin and updated_by.id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para alterar senha deste usuário"
+        )
     
-    @staticmethod
-    async def deactivate_user(
-        session: AsyncSession,
-        user_id: uuid.UUID,
-        deactivated_by: User
-    ) -> User:
-        """Desativa usuário."""
-        try:
-            user = await UserService.get_user_by_id(session, user_id)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Usuário não encontrado"
-                )
-            
-            # Verificar permissões
-            if not deactivated_by.is_admin():
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Sem permissão para desativar usuário"
-                )
-            
-            # Não permitir desativar a si mesmo
-            if user.id == deactivated_by.id:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Não é possível desativar sua própria conta"
-                )
-            
-            user.is_active = False
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            logger.info(
-                f"Usuário {user.email} desativado por {deactivated_by.email}"
-            )
-            
-            return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            await session.rollback()
-            logger.error(f"Erro ao desativar usuário {user_id}: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
-            )
+    user = await get_user_by_id(session, user_id, cache)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
     
-    @staticmethod
-    async def activate_user(
-        session: AsyncSession,
-        user_id: uuid.UUID,
-        activated_by: User
-    ) -> User:
-        """Ativa usuário."""
-        try:
-            user = await UserService.get_user_by_id(session, user_id)
-            if not user:
-                raise HTTPException(
-                    status_code=status.HTTP_404_NOT_FOUND,
-                    detail="Usuário não encontrado"
-                )
-            
-            # Verificar permissões
-            if not activated_by.is_admin():
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Sem permissão para ativar usuário"
-                )
-            
-            user.is_active = True
-            
-            await session.commit()
-            await session.refresh(user)
-            
-            logger.info(
-                f"Usuário {user.email} ativado por {activated_by.email}"
-            )
-            
-            return user
-            
-        except HTTPException:
-            raise
-        except Exception as e:
-            await session.rollback()
-            logger.error(f"Erro ao ativar usuário {user_id}: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
-            )
+    # Se não é admin, verificar senha atual
+    if not is_admin and not await _run_password(
+        verify_password, password_data.current_password, user.hashed_password
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Senha atual incorreta"
+        )
     
-    @staticmethod
-    async def list_users(
-        session: AsyncSession,
-        skip: int = 0,
-        limit: int = 20,
-        role: Optional[UserRole] = None,
-        is_active: Optional[bool] = None,
-        search: Optional[str] = None
-    ) -> tuple[List[User], int]:
-        """Lista usuários com filtros e paginação."""
-        try:
-            # Construir query base
-            query = select(User)
-            
-            # Aplicar filtros
-            conditions = []
-            
-            if role is not None:
-                conditions.append(User.role == role)
-            
-            if is_active is not None:
-                conditions.append(User.is_active == is_active)
-            
-            if search:
-                search_term = f"%{search.lower()}%"
-                conditions.append(
-                    or_(
-                        User.name.ilike(search_term),
-                        User.email.ilike(search_term),
-                        User.department.ilike(search_term)
-                    )
-                )
-            
-            if conditions:
-                query = query.where(and_(*conditions))
-            
-            # Contar total
-            count_query = select(User.id)
-            if conditions:
-                count_query = count_query.where(and_(*conditions))
-            
-            count_result = await session.execute(count_query)
-            total = len(count_result.all())
-            
-            # Aplicar paginação e ordenação
-            query = query.order_by(User.name).offset(skip).limit(limit)
-            
-            result = await session.execute(query)
-            users = result.scalars().all()
-            
-            return list(users), total
-            
-        except Exception as e:
-            logger.error(f"Erro ao listar usuários: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
-            )
+    # Atualizar senha
+    user.hashed_password = await _run_password(
+        get_password_hash, password_data.new_password
+    )
     
-    @staticmethod
-    async def get_user_stats(session: AsyncSession) -> dict:
-        """Obtém estatísticas dos usuários."""
-        try:
-            # Total de usuários
-            total_result = await session.execute(select(User.id))
-            total_users = len(total_result.all())
-            
-            # Usuários ativos
-            active_result = await session.execute(
-                select(User.id).where(User.is_active == True)
-            )
-            active_users = len(active_result.all())
-            
-            # Usuários por role
-            admin_result = await session.execute(
-                select(User.id).where(User.role == UserRole.ADMIN)
-            )
-            admin_count = len(admin_result.all())
-            
-            employee_result = await session.execute(
-                select(User.id).where(User.role == UserRole.EMPLOYEE)
-            )
-            employee_count = len(employee_result.all())
-            
-            return {
-                "total_users": total_users,
-                "active_users": active_users,
-                "inactive_users": total_users - active_users,
-                "admin_count": admin_count,
-                "employee_count": employee_count,
-                "activation_rate": round((active_users / total_users * 100) if total_users > 0 else 0, 2)
-            }
-            
-        except Exception as e:
-            logger.error(f"Erro ao obter estatísticas de usuários: {str(e)}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Erro interno do servidor"
-            )
\ No newline at end of file
+    await session.commit()
+    
+    logger.info(
+        "Senha do usuário {} alterada por {}", user.email, updated_by.email
+    )
+    
+    return user
+
+
+@_retry_transient(actor="deactivated_by")
+async def deactivate_user(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    deactivated_by: User,
+    cache: Optional[dict] = None
+) -> User:
+    """Desativa usuário."""
+    # Verificar permissões
+    if not deactivated_by.is_admin():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para desativar usuário"
+        )
+    
+    # Não permitir desativar a si mesmo
+    if user_id == deactivated_by.id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Não é possível desativar sua própria conta"
+        )
+    
+    # Atualizar em um único UPDATE ... RETURNING
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_active=False)
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
+    
+    await session.commit()
+    _cache_user(cache, user)
+    _stats_cache.clear()
+    
+    logger.info(
+        "Usuário {} desativado por {}", user.email, deactivated_by.email
+    )
+    
+    return user
+
+
+@_retry_transient(actor="activated_by")
+async def activate_user(
+    session: AsyncSession,
+    user_id: uuid.UUID,
+    activated_by: User,
+    cache: Optional[dict] = None
+) -> User:
+    """Ativa usuário."""
+    # Verificar permissões
+    if not activated_by.is_admin():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Sem permissão para ativar usuário"
+        )
+    
+    # Atualizar em um único UPDATE ... RETURNING
+    result = await session.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(is_active=True)
+        .returning(User)
+    )
+    user = result.scalar_one_or_none()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Usuário não encontrado"
+        )
+    
+    await session.commit()
+    _cache_user(cache, user)
+    _stats_cache.clear()
+    
+    logger.info(
+        "Usuário {} ativado por {}", user.email, activated_by.email
+    )
+    
+    return user
+
+
+async def list_users(
+    session: AsyncSession,
+    skip: int = 0,
+    limit: int = 20,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    search: Optional[str] = None
+) -> tuple[List[User], int]:
+    """Lista usuários com filtros e paginação."""
+    # Construir query base
+    query = _LIST_BASE
+    
+    # Aplicar filtros
+    conditions = []
+    
+    if role is not None:
+        conditions.append(User.role == role)
+    
+    if is_active is not None:
+        conditions.append(User.is_active == is_active)
+    
+    if search:
+        # Um predicado por coluna, cada um coberto pelo seu índice de trigramas
+        search_term = f"%{search}%"
+        conditions.append(or_(*(column.ilike(search_term) for column in USER_SEARCH_COLUMNS)))
+    
+    if conditions:
+        query = query.where(and_(*conditions))
+    
+    # Aplicar paginação (ordenação e total já vêm de _LIST_BASE)
+    query = query.offset(skip).limit(limit)
+    
+    rows = (await session.execute(query)).all()
+    users = [row[0] for row in rows]
+    
+    if rows:
+        total = rows[0].total
+    elif skip:
+        # Página além do fim: o total precisa de um COUNT próprio
+        count_query = _COUNT_BASE
+        if conditions:
+            count_query = count_query.where(and_(*conditions))
+        total = (await session.execute(count_query)).scalar_one()
+    else:
+        total = 0
+    
+    return users, total
+
+
+async def get_user_stats(session: AsyncSession) -> dict:
+    """Obtém estatísticas dos usuários."""
+    if "stats" in _stats_cache:
+        return _stats_cache["stats"]
+    
+    # Uma única consulta agrupada por role e situação
+    result = await session.execute(
+        select(User.role, User.is_active, func.count())
+        .group_by(User.role, User.is_active)
+    )
+    
+    total_users = active_users = admin_count = employee_count = 0
+    for role, is_active, count in result.all():
+        total_users += count
+        if is_active:
+            active_users += count
+        if role == UserRole.ADMIN:
+            admin_count += count
+        elif role == UserRole.EMPLOYEE:
+            employee_count += count
+    
+    stats = _stats_cache["stats"] = {
+        "total_users": total_users,
+        "active_users": active_users,
+        "inactive_users": total_users - active_users,
+        "admin_count": admin_count,
+        "employee_count": employee_count,
+        "activation_rate": round((active_users / total_users * 100) if total_users > 0 else 0, 2)
+    }
+    return stats
+
+
+class UserService:
+    """Acesso às funções do serviço de usuários (compatibilidade)."""
+    
+    create_user = staticmethod(create_user)
+    get_user_by_id = staticmethod(get_user_by_id)
+    get_user_by_email = staticmethod(get_user_by_email)
+    authenticate_user = staticmethod(authenticate_user)
+    update_user = staticmethod(update_user)
+    update_password = staticmethod(update_password)
+    deactivate_user = staticmethod(deactivate_user)
+    activate_user = staticmethod(activate_user)
+    list_users = staticmethod(list_users)
+    get_user_stats = staticmethod(get_user_stats)
@@ -0,0 +1,35 @@
+"""Fixtures compartilhadas pelos testes."""
+
+from typing import TYPE_CHECKING, AsyncIterator
+
+import pytest
+
+if TYPE_CHECKING:
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+
+@pytest.fixture
+async def db_session() -> AsyncIterator["AsyncSession"]:
+    """Sessão em um banco de teste recriado a cada teste.
+
+    Os modelos são importados aqui, e não no módulo, para que os testes que
+    não usam o banco sejam coletados mesmo sem app.models disponível.
+    """
+    pytest.importorskip("app.models.livro")
+    from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+    from app.core.config import settings
+    from app.db.base import Base
+
+    engine = create_async_engine(settings.DATABASE_URL_TEST)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session = AsyncSession(engine, expire_on_commit=False)
+    try:
+        yield session
+    finally:
+        await session.close()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
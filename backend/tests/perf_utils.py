@@ -0,0 +1,33 @@
+"""Utilitários de teste para medir round-trips ao banco de dados.
+
+Permitem fixar orçamentos de queries nos testes e transformar regressões
+de desempenho (N+1, SELECTs extras após commit) em falhas de CI.
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+
+@asynccontextmanager
+async def count_queries(conn: AsyncConnection) -> AsyncIterator[List[str]]:
+    """Registra todos os statements SQL executados na conexão.
+
+    Uso:
+        async with count_queries(await session.connection()) as queries:
+            await LivroService.list_livros(session)
+        assert len(queries) <= 2
+    """
+    queries: List[str] = []
+    sync_conn = conn.sync_connection
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append(statement)
+
+    event.listen(sync_conn, "before_cursor_execute", _before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(sync_conn, "before_cursor_execute", _before_cursor_execute)
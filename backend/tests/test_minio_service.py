@@ -0,0 +1,257 @@
+"""Testes da lógica do MinIOService que não depende de um servidor MinIO."""
+
+import hashlib
+import io
+import queue
+import random
+import re
+import threading
+import time
+
+import pytest
+
+# Depende de boto3, cachetools e redis; sem eles o módulo é ignorado
+minio_service = pytest.importorskip("app.services.minio_service")
+
+from cachetools import TTLCache
+
+from app.services.minio_service import MinIOService, _guess_content_type
+
+pytestmark = [pytest.mark.unit, pytest.mark.minio]
+
+
+def _body_bytes(body) -> bytes:
+    """Copia o corpo enviado no momento da chamada (o buffer é reutilizado)."""
+    if hasattr(body, "read"):
+        return body.read()
+    return bytes(body)
+
+
+class StubS3Client:
+    """Cliente S3 em memória que registra as chamadas recebidas."""
+
+    def __init__(self, data: bytes = b""):
+        self.data = data
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _record(self, name, **kwargs):
+        with self._lock:
+            self.calls.append((name, kwargs))
+
+    def put_object(self, **kwargs):
+        kwargs["Body"] = _body_bytes(kwargs["Body"])
+        self._record("put_object", **kwargs)
+        return {"ETag": "put"}
+
+    def create_multipart_upload(self, **kwargs):
+        self._record("create_multipart_upload", **kwargs)
+        return {"UploadId": "upload-1"}
+
+    def upload_part(self, **kwargs):
+        kwargs["Body"] = _body_bytes(kwargs["Body"])
+        self._record("upload_part", **kwargs)
+        return {"ETag": f"etag-{kwargs['PartNumber']}"}
+
+    def complete_multipart_upload(self, **kwargs):
+        self._record("complete_multipart_upload", **kwargs)
+
+    def abort_multipart_upload(self, **kwargs):
+        self._record("abort_multipart_upload", **kwargs)
+
+    def delete_objects(self, **kwargs):
+        self._record("delete_objects", **kwargs)
+        keys = [obj["Key"] for obj in kwargs["Delete"]["Objects"]]
+        return {"Errors": [{"Key": key, "Message": "negado"} for key in keys if key.startswith("bloqueado")]}
+
+    def get_object(self, **kwargs):
+        start, end = map(int, re.fullmatch(r"bytes=(\d+)-(\d+)", kwargs["Range"]).groups())
+        # Atraso aleatório: as faixas terminam fora de ordem
+        time.sleep(random.uniform(0, 0.01))
+        self._record("get_object", **kwargs)
+        return {"Body": io.BytesIO(self.data[start:end + 1])}
+
+    def head_object(self, **kwargs):
+        self._record("head_object", **kwargs)
+        return {"ContentLength": 3, "ContentType": "application/pdf", "ETag": '"abc"', "Metadata": {"original-filename": "a.pdf"}}
+
+    def names(self):
+        return [name for name, _ in self.calls]
+
+
+def _service(client: StubS3Client) -> MinIOService:
+    """Instancia o serviço sem conectar ao MinIO."""
+    service = MinIOService.__new__(MinIOService)
+    service.s3_client = client
+    service._head_cache = TTLCache(maxsize=8192, ttl=5)
+    service._buf_pool = queue.LifoQueue(maxsize=minio_service._BUF_POOL_SIZE)
+    service._buf_count = 0
+    service._buf_lock = threading.Lock()
+    return service
+
+
+@pytest.fixture
+def small_parts(monkeypatch):
+    """Reduz o tamanho das partes para testar a divisão com poucos bytes."""
+    monkeypatch.setattr(minio_service, "_PART_SIZE", 16)
+    return 16
+
+
+class TestGenerateObjectName:
+    def test_nomes_unicos(self):
+        names = {MinIOService._generate_object_name("livro.pdf") for _ in range(1000)}
+        assert len(names) == 1000
+
+    def test_prefixo_e_extensao(self):
+        name = MinIOService._generate_object_name("Livro 12.PDF", prefix="livros/12")
+        assert name.startswith("livros/12/")
+        assert name.endswith(".PDF")
+        assert "/" not in name[len("livros/12/"):]
+
+    def test_sem_prefixo(self):
+        assert "/" not in MinIOService._generate_object_name("arquivo.txt")
+
+
+class TestGuessContentType:
+    @pytest.mark.parametrize("filename, expected", [
+        ("livro.pdf", "application/pdf"),
+        ("LIVRO.PDF", "application/pdf"),
+        ("foto.JPEG", "image/jpeg"),
+        ("planilha.csv", "text/csv"),
+        ("sem_extensao", "application/octet-stream"),
+        ("arquivo.extensaodesconhecida", "application/octet-stream"),
+    ])
+    def test_tipos(self, filename, expected):
+        assert _guess_content_type(filename) == expected
+
+
+class TestDeleteFiles:
+    async def test_lotes_de_no_maximo_mil_chaves(self):
+        client = StubS3Client()
+        service = _service(client)
+        keys = [f"obj-{i}" for i in range(2500)]
+
+        result = await service.delete_files("bucket", keys)
+
+        batches = [kwargs["Delete"]["Objects"] for name, kwargs in client.calls]
+        assert [len(batch) for batch in batches] == [1000, 1000, 500]
+        assert [obj["Key"] for batch in batches for obj in batch] == keys
+        assert result["deleted"] == 2500
+        assert result["errors"] == []
+
+    async def test_falhas_reportadas_por_chave(self):
+        client = StubS3Client()
+        service = _service(client)
+        service._head_cache[("bucket", "obj-1")] = {"size": 1}
+
+        result = await service.delete_files("bucket", ["obj-1", "bloqueado-2"])
+
+        assert result["deleted"] == 1
+        assert result["errors"] == [{"object_name": "bloqueado-2", "message": "negado"}]
+        assert ("bucket", "obj-1") not in service._head_cache
+
+    async def test_lista_vazia_nao_chama_o_minio(self):
+        client = StubS3Client()
+
+        result = await _service(client).delete_files("bucket", [])
+
+        assert client.calls == []
+        assert result["deleted"] == 0
+
+
+class TestGetFileInfo:
+    async def test_cache_devolve_copias(self):
+        client = StubS3Client()
+        service = _service(client)
+
+        info = await service.get_file_info("bucket", "obj")
+        info["extra"] = True
+        info["metadata"]["alterado"] = "sim"
+        cached = await service.get_file_info("bucket", "obj")
+
+        assert client.names() == ["head_object"]
+        assert "extra" not in cached
+        assert cached["metadata"] == {"original-filename": "a.pdf"}
+        assert cached["etag"] == "abc"
+
+
+class TestIterRanges:
+    async def test_faixas_entregues_em_ordem(self, small_parts):
+        # Mais faixas que a concorrência, para exercitar a reposição da fila
+        data = bytes(random.getrandbits(8) for _ in range(small_parts * 20 + 5))
+        client = StubS3Client(data)
+
+        chunks = [
+            chunk async for chunk in _service(client)._iter_ranges("bucket", "obj", len(data))
+        ]
+
+        assert b"".join(chunks) == data
+        assert [len(chunk) for chunk in chunks] == [small_parts] * 20 + [5]
+        assert client.names().count("get_object") == 21
+
+
+class TestUploadStream:
+    def _upload(self, service, data: bytes) -> str:
+        return service._upload_stream(io.BytesIO(data), "bucket", "obj", "application/pdf", {})
+
+    def test_arquivo_menor_que_uma_parte_usa_put(self, small_parts):
+        client = StubS3Client()
+
+        sha256 = self._upload(_service(client), b"x" * (small_parts - 1))
+
+        assert sha256 == hashlib.sha256(b"x" * (small_parts - 1)).hexdigest()
+
+        assert client.names() == ["put_object"]
+        assert client.calls[0][1]["Body"] == b"x" * (small_parts - 1)
+
+    def test_arquivo_vazio_usa_put(self, small_parts):
+        client = StubS3Client()
+
+        self._upload(_service(client), b"")
+
+        assert client.names() == ["put_object"]
+        assert client.calls[0][1]["Body"] == b""
+
+    def test_divide_em_partes(self, small_parts):
+        client = StubS3Client()
+        data = bytes(range(small_parts * 3 + 7))
+
+        sha256 = self._upload(_service(client), data)
+
+        assert sha256 == hashlib.sha256(data).hexdigest()
+
+        assert client.names() == [
+            "create_multipart_upload",
+            "upload_part", "upload_part", "upload_part", "upload_part",
+            "complete_multipart_upload",
+        ]
+        parts = [kwargs for name, kwargs in client.calls if name == "upload_part"]
+        assert [part["PartNumber"] for part in parts] == [1, 2, 3, 4]
+        assert b"".join(part["Body"] for part in parts) == data
+        assert client.calls[-1][1]["MultipartUpload"]["Parts"] == [
+            {"ETag": f"etag-{n}", "PartNumber": n} for n in (1, 2, 3, 4)
+        ]
+
+    def test_multiplo_exato_do_tamanho_da_parte(self, small_parts):
+        client = StubS3Client()
+        data = b"a" * small_parts + b"b" * small_parts
+
+        self._upload(_service(client), data)
+
+        parts = [kwargs["Body"] for name, kwargs in client.calls if name == "upload_part"]
+        assert parts == [b"a" * small_parts, b"b" * small_parts]
+
+    def test_falha_aborta_o_upload_e_devolve_o_buffer(self, small_parts):
+        client = StubS3Client()
+
+        def _falha(**kwargs):
+            raise RuntimeError("falha de rede")
+
+        client.upload_part = _falha
+        service = _service(client)
+
+        with pytest.raises(RuntimeError):
+            self._upload(service, b"z" * (small_parts * 2))
+
+        assert client.names()[-1] == "abort_multipart_upload"
+        assert service._buf_pool.qsize() == 1
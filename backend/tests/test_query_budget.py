@@ -0,0 +1,71 @@
+"""Orçamentos de round-trips ao banco das operações mais usadas de livros."""
+
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("app.models.livro")
+
+from app.models.livro import Livro, StatusLivro
+from app.services.livro_service import LivroService
+from tests.perf_utils import count_queries
+
+pytestmark = [pytest.mark.database, pytest.mark.performance]
+
+
+def _livro(numero: int) -> Livro:
+    return Livro(
+        numero=numero,
+        ano=2024,
+        tipo="Notas",
+        status=StatusLivro.ATIVO,
+        data_abertura=datetime(2024, 1, 1)
+    )
+
+
+def _ato(numero: int) -> SimpleNamespace:
+    # O serviço lê também conteudo_original e dados_extraidos
+    return SimpleNamespace(
+        numero_ato=str(numero),
+        tipo_ato="Escritura",
+        data_ato=None,
+        conteudo_original=f"Ato {numero}",
+        conteudo_markdown=f"# Ato {numero}",
+        partes=[],
+        dados_extraidos={}
+    )
+
+
+async def test_list_livros_usa_no_maximo_duas_queries(db_session):
+    """Contagem + página, sem lazy loads por livro."""
+    db_session.add_all(_livro(numero) for numero in range(1, 31))
+    await db_session.commit()
+
+    async with count_queries(await db_session.connection()) as queries:
+        livros, total = await LivroService.list_livros(db_session, limit=20)
+
+    assert total == 30
+    assert len(livros) == 20
+    assert len(queries) <= 2
+
+
+@pytest.mark.parametrize("quantidade", [1, 50])
+async def test_add_atos_processados_usa_um_unico_insert(db_session, quantidade):
+    """Os atos são gravados em um INSERT, independente da quantidade.
+
+    add_atos_processados usa insert(Ato).returning(Ato) com a lista de
+    atos, que o SQLAlchemy agrupa em um INSERT de várias linhas.
+    """
+    livro = _livro(1)
+    db_session.add(livro)
+    await db_session.commit()
+
+    async with count_queries(await db_session.connection()) as queries:
+        atos = await LivroService.add_atos_processados(
+            db_session, livro.id, [_ato(numero) for numero in range(quantidade)]
+        )
+
+    inserts = [q for q in queries if q.lstrip().upper().startswith("INSERT")]
+    assert len(atos) == quantidade
+    assert len(inserts) == 1
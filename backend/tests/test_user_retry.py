@@ -0,0 +1,87 @@
+"""Nova tentativa após falha transitória do banco nas rotas de usuários."""
+
+import uuid
+
+import pytest
+
+pytest.importorskip("app.models.user")
+pytest.importorskip("app.core.auth")
+
+from sqlalchemy.exc import DBAPIError
+
+from app.api import users as users_api
+from app.services import user_service
+
+pytestmark = [pytest.mark.unit, pytest.mark.api]
+
+
+class _SerializationFailure(Exception):
+    sqlstate = "40001"
+
+
+class _ExpiringUser:
+    """Usuário cujos atributos deixam de ser legíveis após um rollback.
+
+    Simula a instância expirada de uma sessão assíncrona, em que reler um
+    atributo dispararia um lazy load (MissingGreenlet).
+    """
+
+    def __init__(self):
+        self.expired = False
+        self._id = uuid.uuid4()
+
+    def _check(self):
+        if self.expired:
+            raise RuntimeError("lazy load em instância expirada")
+
+    @property
+    def id(self):
+        self._check()
+        return self._id
+
+    @property
+    def email(self):
+        self._check()
+        return "admin@example.com"
+
+    def is_admin(self):
+        self._check()
+        return True
+
+
+class _Session:
+    def __init__(self, user: _ExpiringUser):
+        self.user = user
+        self.rollbacks = 0
+
+    async def rollback(self):
+        self.rollbacks += 1
+        self.user.expired = True
+
+
+async def test_rota_conclui_apos_uma_falha_de_serializacao(monkeypatch):
+    current_user = _ExpiringUser()
+    session = _Session(current_user)
+    calls = []
+
+    async def _deactivate(session, user_id, deactivated_by, cache=None):
+        calls.append(deactivated_by)
+        if len(calls) == 1:
+            raise DBAPIError("UPDATE users", {}, _SerializationFailure())
+        return True
+
+    monkeypatch.setattr(
+        user_service.UserService,
+        "deactivate_user",
+        staticmethod(user_service._retry_transient(actor="deactivated_by")(_deactivate))
+    )
+
+    response = await users_api.deactivate_user(
+        uuid.uuid4(), db=session, current_user=current_user, user_cache={}
+    )
+
+    assert response.message == "Usuário desativado com sucesso"
+    assert len(calls) == 2
+    assert session.rollbacks == 1
+    # As duas tentativas recebem o snapshot, não o usuário expirado
+    assert all(actor.email == "admin@example.com" for actor in calls)